@@ -0,0 +1,86 @@
+"""
+Cost of serialising /images/list pages with format_image_row, with a cold
+presigned url cache (every url signed) and a warm one.
+
+Needs the storage bucket to be reachable (see docker-compose.yml), as the S3
+client checks it on import. Run from the api directory:
+    python -m benchmarks.format_rows --rows 100 --runs 50
+    python -m benchmarks.format_rows --json > format_rows.json
+"""
+import argparse
+import json
+import statistics
+import time
+from datetime import datetime
+from core import models
+from core.s3utils import s3_client
+from services.images import format_image_row
+
+
+def make_rows(count: int, detections: int) -> list:
+    now = datetime.utcnow()
+    return [
+        models.Image(
+            image_id=index,
+            name=f"benchmark_{index}.jpg",
+            storage_path=f"uploads/benchmark_{index}.jpg",
+            is_processed=True,
+            is_nsfw=False,
+            detected_objects=[
+                {"box": [10.0 * n, 20.0 * n, 10.0 * n + 120, 20.0 * n + 90], "class": "person", "confidence": 0.9}
+                for n in range(detections)
+            ],
+            detected_nsfw=[{"box": [100, 100, 50, 50], "class": "FACE_FEMALE", "score": 0.6}],
+            processed_image_path=f"processed/{index}/detected.jpg",
+            analyses=["nsfw", "objects", "annotate"],
+            width=4032,
+            height=3024,
+            derivatives={"thumbnail": f"processed/{index}/thumbnail.webp", "medium": f"processed/{index}/medium.webp"},
+            created_at=now,
+            updated_at=now,
+        )
+        for index in range(count)
+    ]
+
+
+def measure_page(rows: list, runs: int, cold: bool) -> dict:
+    latencies = []
+    for _ in range(runs):
+        if cold:
+            s3_client.url_cache.invalidate()
+        start = time.perf_counter()
+        [format_image_row(row) for row in rows]
+        latencies.append(time.perf_counter() - start)
+    latencies.sort()
+    return {
+        'mean_ms': 1000 * statistics.fmean(latencies),
+        'p50_ms': 1000 * statistics.median(latencies),
+        'p95_ms': 1000 * latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))],
+        'per_row_us': 1e6 * statistics.fmean(latencies) / len(rows),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=100, help='Rows per page')
+    parser.add_argument('--runs', type=int, default=50)
+    parser.add_argument('--detections', type=int, default=20, help='Object detections per row')
+    parser.add_argument('--json', action='store_true', help='Print the results as JSON instead of a table')
+    args = parser.parse_args()
+
+    rows = make_rows(args.rows, args.detections)
+    results = {
+        'format_image_row_cold': measure_page(rows, args.runs, cold=True),
+        'format_image_row_warm': measure_page(rows, args.runs, cold=False),
+    }
+    if args.json:
+        print(json.dumps(results))
+        return
+    print(f"{args.rows} rows per page, {args.detections} detections per row")
+    print(f"{'cache':<24}{'page ms':>10}{'p95 ms':>10}{'row us':>10}")
+    for name, result in results.items():
+        print(f"{name:<24}{result['mean_ms']:>10.2f}{result['p95_ms']:>10.2f}{result['per_row_us']:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
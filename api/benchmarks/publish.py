@@ -0,0 +1,91 @@
+"""
+Publish latency and throughput of the previous connection-per-message
+strategy against the pooled publisher, with and without batched confirms.
+
+Needs a running RabbitMQ (see docker-compose.yml). Run from the api directory:
+    python -m benchmarks.publish --messages 500 --concurrency 20
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import time
+import aio_pika
+from core.config import Config
+from core.rabbitmq import RabbitMQClient, get_rabbitmq_url
+
+BENCHMARK_QUEUE = 'benchmark_publish'
+
+
+async def publish_with_new_connection(message: dict) -> None:
+    # What every upload used to do: connect, declare, publish, disconnect
+    connection = await aio_pika.connect(get_rabbitmq_url())
+    async with connection:
+        channel = await connection.channel()
+        await channel.declare_queue(BENCHMARK_QUEUE, durable=True)
+        await channel.default_exchange.publish(
+            aio_pika.Message(body=json.dumps(message).encode(), delivery_mode=aio_pika.DeliveryMode.PERSISTENT),
+            routing_key=BENCHMARK_QUEUE
+        )
+
+
+async def run_concurrently(publish, count: int, concurrency: int) -> tuple:
+    latencies = []
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def timed(index: int) -> None:
+        async with semaphore:
+            start = time.perf_counter()
+            await publish({"image_id": index, "storage_path": f"uploads/benchmark_{index}.jpg"})
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(timed(index) for index in range(count)))
+    return time.perf_counter() - start, latencies
+
+
+def report(name: str, count: int, elapsed: float, latencies: list) -> None:
+    latencies = sorted(latencies)
+    p50 = statistics.median(latencies) * 1000
+    p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] * 1000
+    print(f"{name:<24}{count / elapsed:>10.1f}{p50:>10.2f}{p99:>10.2f}")
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--messages', type=int, default=500, help='Messages published per strategy')
+    parser.add_argument('--concurrency', type=int, default=20, help='Concurrent publishers, like concurrent uploads')
+    parser.add_argument('--batch-size', type=int, default=50, help='Messages per batched confirm')
+    args = parser.parse_args()
+
+    # Publish into a scratch queue so no worker picks the messages up
+    Config.RABBITMQ_IMAGE_PROCESSING_QUEUE = BENCHMARK_QUEUE
+    client = RabbitMQClient()
+    await client.connect()
+
+    print(f"{'strategy':<24}{'msg/s':>10}{'p50 ms':>10}{'p99 ms':>10}")
+    elapsed, latencies = await run_concurrently(publish_with_new_connection, args.messages, args.concurrency)
+    report('connection per message', args.messages, elapsed, latencies)
+
+    elapsed, latencies = await run_concurrently(client.publish_message, args.messages, args.concurrency)
+    report('pooled channel', args.messages, elapsed, latencies)
+
+    batches = [
+        [{"image_id": index, "storage_path": f"uploads/benchmark_{index}.jpg"} for index in range(start, min(start + args.batch_size, args.messages))]
+        for start in range(0, args.messages, args.batch_size)
+    ]
+    latencies = []
+    start = time.perf_counter()
+    for batch in batches:
+        batch_start = time.perf_counter()
+        await client.publish_messages(batch)
+        latencies.append(time.perf_counter() - batch_start)
+    report(f'batched confirms ({args.batch_size})', args.messages, time.perf_counter() - start, latencies)
+
+    async with client._channel_pool.acquire() as channel:
+        await channel.queue_delete(BENCHMARK_QUEUE)
+    await client.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -17,4 +17,27 @@ class Config(object):
     RABBITMQ_USER = os.getenv('RABBITMQ_USER')
     RABBITMQ_PASSWORD = os.getenv('RABBITMQ_PASSWORD')
     RABBITMQ_VHOST = os.getenv('RABBITMQ_VHOST')
-    RABBITMQ_IMAGE_PROCESSING_QUEUE = os.getenv('RABBITMQ_IMAGE_PROCESSING_QUEUE')
\ No newline at end of file
+    RABBITMQ_IMAGE_PROCESSING_QUEUE = os.getenv('RABBITMQ_IMAGE_PROCESSING_QUEUE')
+    RABBITMQ_CHANNEL_POOL_SIZE = int(os.getenv('RABBITMQ_CHANNEL_POOL_SIZE', 10))
+    RABBITMQ_PUBLISH_TIMEOUT = float(os.getenv('RABBITMQ_PUBLISH_TIMEOUT', 10))
+    S3_MAX_POOL_CONNECTIONS = int(os.getenv('S3_MAX_POOL_CONNECTIONS', 50))
+    S3_MULTIPART_THRESHOLD = int(os.getenv('S3_MULTIPART_THRESHOLD', 8 * 1024 * 1024))
+    S3_MULTIPART_PART_SIZE = int(os.getenv('S3_MULTIPART_PART_SIZE', 8 * 1024 * 1024))
+    S3_MULTIPART_CONCURRENCY = int(os.getenv('S3_MULTIPART_CONCURRENCY', 4))
+    PRESIGNED_URL_EXPIRES_IN = int(os.getenv('PRESIGNED_URL_EXPIRES_IN', 3600))
+    PRESIGNED_URL_CACHE_TTL = int(os.getenv('PRESIGNED_URL_CACHE_TTL', PRESIGNED_URL_EXPIRES_IN // 2))
+    PRESIGNED_URL_CACHE_SIZE = int(os.getenv('PRESIGNED_URL_CACHE_SIZE', 10000))
+    UPLOAD_MAX_SIZE = int(os.getenv('UPLOAD_MAX_SIZE', 50 * 1024 * 1024))
+    PRESIGNED_UPLOAD_EXPIRES_IN = int(os.getenv('PRESIGNED_UPLOAD_EXPIRES_IN', 900))
+    IMAGE_COUNT_CACHE_TTL = int(os.getenv('IMAGE_COUNT_CACHE_TTL', 30))
+    RABBITMQ_EVENTS_EXCHANGE = os.getenv('RABBITMQ_EVENTS_EXCHANGE', 'image_events')
+    EVENTS_SUBSCRIBER_QUEUE_SIZE = int(os.getenv('EVENTS_SUBSCRIBER_QUEUE_SIZE', 100))
+    EVENTS_HEARTBEAT_INTERVAL = float(os.getenv('EVENTS_HEARTBEAT_INTERVAL', 15))
+    EVENTS_RETRY_MS = int(os.getenv('EVENTS_RETRY_MS', 3000))
+    BATCH_UPLOAD_MAX_FILES = int(os.getenv('BATCH_UPLOAD_MAX_FILES', 1000))
+    BATCH_UPLOAD_CONCURRENCY = int(os.getenv('BATCH_UPLOAD_CONCURRENCY', 8))
+    BATCH_UPLOAD_SPOOL_SIZE = int(os.getenv('BATCH_UPLOAD_SPOOL_SIZE', 1024 * 1024))
+    LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO')
+    DATABASE_ECHO = os.getenv('DATABASE_ECHO', 'false').lower() == 'true'
+    RABBITMQ_BULK_QUEUE = os.getenv('RABBITMQ_BULK_QUEUE', f"{RABBITMQ_IMAGE_PROCESSING_QUEUE}_bulk")
+    RABBITMQ_BULK_SIZE_THRESHOLD = int(os.getenv('RABBITMQ_BULK_SIZE_THRESHOLD', 10 * 1024 * 1024))
\ No newline at end of file
@@ -1,8 +1,10 @@
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
 from sqlalchemy.orm import sessionmaker, declarative_base
 from core.config import Config
+from core.metrics import instrument_engine
 
-engine = create_async_engine(Config.DATABASE_URL, echo=True)
+engine = create_async_engine(Config.DATABASE_URL, echo=Config.DATABASE_ECHO)
+instrument_engine(engine)
 async_session = sessionmaker(engine, class_=AsyncSession)
 Base = declarative_base()
 
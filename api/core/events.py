@@ -0,0 +1,104 @@
+import asyncio
+import json
+import logging
+from contextlib import asynccontextmanager
+import aio_pika
+from core.config import Config
+from core.rabbitmq import get_rabbitmq_url
+from core.metrics import timed
+
+logger = logging.getLogger(__name__)
+
+
+class EventBroker:
+    """
+    Fans image events out to every API replica through a RabbitMQ fanout
+    exchange. Each replica binds its own exclusive queue and hands what it
+    receives to its local subscribers (the open event streams), so clients
+    learn about results without polling and the database is not touched.
+
+    Uses its own connection so consuming never shares flow control with
+    the publishing connection of RabbitMQClient.
+    """
+
+    def __init__(self):
+        self._connection = None
+        self._channel = None
+        self._exchange = None
+        self._subscribers = set()
+
+    async def connect(self) -> None:
+        self._connection = await aio_pika.connect_robust(get_rabbitmq_url())
+        self._channel = await self._connection.channel()
+        self._exchange = await self._channel.declare_exchange(
+            Config.RABBITMQ_EVENTS_EXCHANGE,
+            aio_pika.ExchangeType.FANOUT,
+            durable=True
+        )
+        # Server named, deleted with the connection; events are only of interest while a replica is up
+        queue = await self._channel.declare_queue(exclusive=True, auto_delete=True)
+        await queue.bind(self._exchange)
+        await queue.consume(self._dispatch, no_ack=True)
+
+    async def close(self) -> None:
+        if self._connection is not None:
+            await self._connection.close()
+        self._connection = None
+        self._channel = None
+        self._exchange = None
+
+    async def publish(self, events: list) -> None:
+        """Publish events to all replicas. Failures are logged, never raised: events are a hint, the database is the truth."""
+        if not events or self._exchange is None:
+            return
+        try:
+            with timed('event_publish'):
+                await self._exchange.publish(
+                    aio_pika.Message(
+                        body=json.dumps({'events': events}, default=str).encode(),
+                        content_type='application/json',
+                        delivery_mode=aio_pika.DeliveryMode.NOT_PERSISTENT
+                    ),
+                    routing_key=''
+                )
+        except Exception as e:
+            logger.warning(f"[Events] Failed to publish {len(events)} events: {e}")
+
+    async def _dispatch(self, message: aio_pika.abc.AbstractIncomingMessage) -> None:
+        try:
+            events = json.loads(message.body.decode())['events']
+        except Exception as e:
+            logger.warning(f"[Events] Dropping malformed message: {e}")
+            return
+        for queue in list(self._subscribers):
+            for event in events:
+                try:
+                    queue.put_nowait(event)
+                except asyncio.QueueFull:
+                    # A stalled client loses events rather than holding memory; it can still fetch the image
+                    logger.warning("[Events] Subscriber queue full, dropping event")
+                    break
+
+    @asynccontextmanager
+    async def subscribe(self):
+        queue = asyncio.Queue(maxsize=Config.EVENTS_SUBSCRIBER_QUEUE_SIZE)
+        self._subscribers.add(queue)
+        try:
+            yield queue
+        finally:
+            self._subscribers.discard(queue)
+
+    @property
+    def subscriber_count(self) -> int:
+        return len(self._subscribers)
+
+
+def image_processed_event(image_id: int, is_nsfw=None) -> dict:
+    return {
+        "type": "image.processed",
+        "image_id": image_id,
+        "is_nsfw": is_nsfw
+    }
+
+
+event_broker = EventBroker()
@@ -0,0 +1,47 @@
+import time
+from contextlib import contextmanager
+from prometheus_client import Histogram, generate_latest, CONTENT_TYPE_LATEST
+from sqlalchemy import event
+
+# From sub-millisecond (url signing, cached queries) up to slow uploads
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+request_seconds = Histogram(
+    'api_request_seconds',
+    'Time to answer a request, by route template',
+    ['method', 'route', 'status'],
+    buckets=LATENCY_BUCKETS
+)
+operation_seconds = Histogram(
+    'api_operation_seconds',
+    'Time spent in backend calls: db, s3_sign, s3_upload, s3_head, publish, event_publish',
+    ['operation'],
+    buckets=LATENCY_BUCKETS
+)
+
+
+@contextmanager
+def timed(operation: str):
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        operation_seconds.labels(operation).observe(time.perf_counter() - started)
+
+
+def instrument_engine(engine) -> None:
+    """Time every statement on the engine, including those run by the ORM, as the 'db' operation."""
+    sync_engine = engine.sync_engine
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('query_started', []).append(time.perf_counter())
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        started = conn.info['query_started'].pop()
+        operation_seconds.labels('db').observe(time.perf_counter() - started)
+
+
+def render_metrics() -> tuple:
+    return generate_latest(), CONTENT_TYPE_LATEST
@@ -0,0 +1,33 @@
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+# create_all only creates missing tables, so columns added to existing ones are
+# applied here. Every statement is idempotent and runs on each startup.
+COLUMN_UPGRADES = (
+    "ALTER TABLE images ADD COLUMN IF NOT EXISTS content_hash VARCHAR(64)",
+    "ALTER TABLE images ADD COLUMN IF NOT EXISTS analyses JSONB",
+    "ALTER TABLE images ADD COLUMN IF NOT EXISTS width INTEGER",
+    "ALTER TABLE images ADD COLUMN IF NOT EXISTS height INTEGER",
+    "ALTER TABLE images ADD COLUMN IF NOT EXISTS derivatives JSONB",
+)
+
+# Built concurrently so a large existing table stays writable meanwhile. A build
+# that was interrupted leaves an invalid index that IF NOT EXISTS skips; drop it to retry.
+INDEX_UPGRADES = (
+    "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_images_content_hash ON images (content_hash)",
+    "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_images_created_at_image_id ON images (created_at, image_id)",
+    "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_images_name_trgm ON images USING gin (name gin_trgm_ops)",
+)
+
+
+async def upgrade_schema(conn: AsyncConnection) -> None:
+    for statement in COLUMN_UPGRADES:
+        await conn.execute(text(statement))
+
+
+async def upgrade_indexes(engine) -> None:
+    """Create indexes missing from existing tables. Needs pg_trgm; cannot run inside a transaction."""
+    async with engine.connect() as conn:
+        conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+        for statement in INDEX_UPGRADES:
+            await conn.execute(text(statement))
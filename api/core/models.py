@@ -1,4 +1,5 @@
-from sqlalchemy import  Column, Integer, String, DateTime, Boolean, JSON
+from sqlalchemy import  Column, Integer, String, DateTime, Boolean, JSON, Index
+from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.sql import func
 from sqlalchemy.orm import declarative_mixin
 
@@ -12,6 +13,12 @@ class Timestamp:
 
 class Image(Timestamp, Base):
     __tablename__ = "images"
+    __table_args__ = (
+        # Keyset pagination over (created_at, image_id) in either direction
+        Index("ix_images_created_at_image_id", "created_at", "image_id"),
+        # Trigram index so name ILIKE '%term%' does not scan the table (needs pg_trgm)
+        Index("ix_images_name_trgm", "name", postgresql_using="gin", postgresql_ops={"name": "gin_trgm_ops"}),
+    )
 
     image_id = Column(Integer, primary_key=True)
     name = Column(String, nullable=False)
@@ -21,3 +28,11 @@ class Image(Timestamp, Base):
     processed_image_path = Column(String, nullable=True)
     detected_nsfw = Column(JSON, nullable=True)
     detected_objects = Column(JSON, nullable=True)
+    content_hash = Column(String(64), nullable=True, index=True)
+    # Storage paths of the WebP derivatives (thumbnail, medium) by name
+    derivatives = Column(JSONB, nullable=True)
+    # Original image size, so box geometry can be served relative to it
+    width = Column(Integer, nullable=True)
+    height = Column(Integer, nullable=True)
+    # Analyses run on the image (nsfw, objects, annotate); NULL for rows from before it was selectable, which ran all of them
+    analyses = Column(JSONB, nullable=True)
\ No newline at end of file
@@ -1,46 +1,124 @@
-import pika
+import asyncio
 import json
+import logging
 import time
-from pika.exceptions import AMQPConnectionError, StreamLostError
+import aio_pika
+from aio_pika.pool import Pool
+from aio_pika.exceptions import AMQPError
 from core.config import Config
+from core.metrics import timed
+
+logger = logging.getLogger(__name__)
+
+# Processing tiers, each with its own queue; workers choose which tiers they consume and how many of each at once
+PRIORITIES = ('interactive', 'bulk')
+
+RETRYABLE_ERRORS = (AMQPError, ConnectionError, asyncio.TimeoutError)
+
+
+def get_rabbitmq_url() -> str:
+    return f"amqp://{Config.RABBITMQ_USER}:{Config.RABBITMQ_PASSWORD}@{Config.RABBITMQ_HOST}:{Config.RABBITMQ_PORT}/{Config.RABBITMQ_VHOST}"
+
 
 class RabbitMQClient:
+    """
+    Publisher that keeps one robust connection and a pool of confirm-mode
+    channels for the lifetime of the app. The connection and its channels
+    are re-established automatically after a broker restart or network error.
+    """
+
     def __init__(self, max_retries: int = 3, retry_delay: int = 5):
         self.max_retries = max_retries
         self.retry_delay = retry_delay
+        self._connection = None
+        self._channel_pool = None
+
+    async def connect(self) -> None:
+        self._connection = await aio_pika.connect_robust(get_rabbitmq_url())
+        self._channel_pool = Pool(self._open_channel, max_size=Config.RABBITMQ_CHANNEL_POOL_SIZE)
+        async with self._channel_pool.acquire() as channel:
+            # Declared here too, so messages for a tier no worker consumes yet are kept
+            for queue in self.queues().values():
+                await channel.declare_queue(queue, durable=True)
 
-    def _connect(self):
-        connection = pika.BlockingConnection(
-            pika.ConnectionParameters(
-                host=Config.RABBITMQ_HOST,
-                heartbeat=60,
-                blocked_connection_timeout=300,
-                credentials=pika.PlainCredentials(
-                    Config.RABBITMQ_USER,
-                    Config.RABBITMQ_PASSWORD
-                )
-            )
+    async def close(self) -> None:
+        if self._channel_pool is not None:
+            await self._channel_pool.close()
+        if self._connection is not None:
+            await self._connection.close()
+        self._channel_pool = None
+        self._connection = None
+
+    async def _open_channel(self) -> aio_pika.abc.AbstractChannel:
+        return await self._connection.channel(publisher_confirms=True)
+
+    @staticmethod
+    def queues() -> dict:
+        return {
+            'interactive': Config.RABBITMQ_IMAGE_PROCESSING_QUEUE,
+            'bulk': Config.RABBITMQ_BULK_QUEUE,
+        }
+
+    def route(self, message: dict) -> str:
+        """
+        Queue of a processing message. Bulk work and images above
+        RABBITMQ_BULK_SIZE_THRESHOLD go to the bulk tier, so a backlog of
+        large imports never delays interactive uploads.
+        """
+        if message.get('priority') == 'bulk' or (message.get('size') or 0) > Config.RABBITMQ_BULK_SIZE_THRESHOLD:
+            return self.queues()['bulk']
+        return self.queues()['interactive']
+
+    @staticmethod
+    def _build_message(message: dict) -> aio_pika.Message:
+        return aio_pika.Message(
+            body=json.dumps(message).encode(),
+            content_type='application/json',
+            delivery_mode=aio_pika.DeliveryMode.PERSISTENT,
+            # The AMQP timestamp has one second resolution; workers measure queue wait from the header
+            headers={'x-published-at': time.time()}
         )
-        channel = connection.channel()
-        channel.queue_declare(queue=Config.RABBITMQ_IMAGE_PROCESSING_QUEUE, durable=True)
-        return connection, channel
 
-    def publish_message(self, message: dict):
+    async def publish_message(self, message: dict) -> None:
+        await self.publish_messages([message])
+
+    async def publish_messages(self, messages: list) -> None:
+        """
+        Publish all messages on one channel and wait for the broker to confirm
+        them together, instead of one round trip per message. Each message
+        goes to the queue of its tier, see route().
+        """
+        if self._channel_pool is None:
+            raise Exception("RabbitMQ client is not connected")
+
+        pending = list(messages)
         attempts = 0
         while attempts < self.max_retries:
             try:
-                connection, channel = self._connect()
-                channel.basic_publish(
-                    exchange='',
-                    routing_key=Config.RABBITMQ_IMAGE_PROCESSING_QUEUE,
-                    body=json.dumps(message),
-                    properties=pika.BasicProperties(delivery_mode=2)
-                )
-                connection.close()
-                break
-            except (AMQPConnectionError, StreamLostError, ConnectionResetError) as e:
-                attempts += 1
-                print(f"[RabbitMQ] Publish attempt {attempts} failed: {e}")
-                time.sleep(self.retry_delay)
-        else:
-            raise Exception("Failed to publish message to RabbitMQ after multiple attempts")
\ No newline at end of file
+                async with self._channel_pool.acquire() as channel, timed('publish'):
+                    results = await asyncio.gather(*(
+                        channel.default_exchange.publish(
+                            self._build_message(message),
+                            routing_key=self.route(message),
+                            timeout=Config.RABBITMQ_PUBLISH_TIMEOUT
+                        )
+                        for message in pending
+                    ), return_exceptions=True)
+            except RETRYABLE_ERRORS as e:
+                # Nothing was published on a channel that could not be acquired
+                results = [e] * len(pending)
+
+            # Only messages the broker did not confirm are sent again, so confirmed ones are never duplicated
+            failed = [(message, result) for message, result in zip(pending, results) if isinstance(result, BaseException)]
+            for _, result in failed:
+                if not isinstance(result, RETRYABLE_ERRORS):
+                    raise result
+            if not failed:
+                return
+            pending = [message for message, _ in failed]
+            attempts += 1
+            logger.warning(f"[RabbitMQ] Publish attempt {attempts} failed for {len(pending)} of {len(messages)} messages: {failed[0][1]}")
+            await asyncio.sleep(self.retry_delay)
+        raise Exception(f"Failed to publish {len(pending)} messages to RabbitMQ after multiple attempts")
+
+rabbitmq_client = RabbitMQClient()
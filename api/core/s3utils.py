@@ -1,6 +1,12 @@
+import uuid
 import boto3
+from boto3.s3.transfer import TransferConfig
+from botocore.config import Config as BotoConfig
+from starlette.concurrency import run_in_threadpool
 from core.config import Config
-from typing import Dict
+from core.cache import TTLCache
+from core.metrics import timed
+from typing import Dict, Any, Optional
 from fastapi import HTTPException
 from datetime import datetime
 from werkzeug.utils import secure_filename
@@ -13,9 +19,20 @@ class S3Client:
             endpoint_url=Config.AWS_S3_ENDPOINT_URL,
             aws_access_key_id=Config.AWS_ACCESS_KEY_ID,
             aws_secret_access_key=Config.AWS_SECRET_ACCESS_KEY,
-            region_name=Config.AWS_REGION
+            region_name=Config.AWS_REGION,
+            # One connection pool shared by every request and multipart part
+            config=BotoConfig(max_pool_connections=Config.S3_MAX_POOL_CONNECTIONS)
+        )
+        self.transfer_config = TransferConfig(
+            multipart_threshold=Config.S3_MULTIPART_THRESHOLD,
+            multipart_chunksize=Config.S3_MULTIPART_PART_SIZE,
+            max_concurrency=Config.S3_MULTIPART_CONCURRENCY
         )
         self.bucket_name = Config.AWS_S3_BUCKET_NAME
+        if Config.PRESIGNED_URL_CACHE_TTL >= Config.PRESIGNED_URL_EXPIRES_IN:
+            raise ValueError("PRESIGNED_URL_CACHE_TTL must be lower than PRESIGNED_URL_EXPIRES_IN")
+        # Public GET urls by object key; entries expire well before the urls themselves
+        self.url_cache = TTLCache(Config.PRESIGNED_URL_CACHE_SIZE, Config.PRESIGNED_URL_CACHE_TTL)
         self.check_bucket()
     
     def check_bucket(self) -> None:
@@ -28,19 +45,24 @@ class S3Client:
         safe_name = secure_filename(filename)
         timestamp = datetime.utcnow().strftime("%Y%m%d%H%M%S%f")[:-3]
         name, ext = safe_name.rsplit('.', 1)
-        return f"{timestamp}_{name}.{ext}"
+        # Batch uploads store many files within the same millisecond, often with the same name
+        return f"{timestamp}_{uuid.uuid4().hex[:8]}_{name}.{ext}"
 
-    def upload_file(self, file_obj, content_type: str, filename: str) -> Dict[str, str]:
+    async def upload_file(self, file_obj, content_type: str, filename: str) -> Dict[str, str]:
         try:            
             object_key = f"uploads/{self.clean_filename(filename)}"
-            self.s3_client.upload_fileobj(
-                file_obj,
-                self.bucket_name,
-                object_key,
-                ExtraArgs={
-                    'ContentType': content_type
-                }
-            )
+            # Streams the file in parts from a worker thread so the event loop stays free
+            with timed('s3_upload'):
+                await run_in_threadpool(
+                    self.s3_client.upload_fileobj,
+                    file_obj,
+                    self.bucket_name,
+                    object_key,
+                    ExtraArgs={
+                        'ContentType': content_type
+                    },
+                    Config=self.transfer_config
+                )
             return object_key
         except Exception as e:
             raise HTTPException(status_code=500, detail=f"Failed to upload file: {str(e)}")
@@ -54,24 +76,68 @@ class S3Client:
     
     def generate_presigned_get_url(self, object_key: str) -> str:
         try:
-            url = self.s3_client.generate_presigned_url(
-                'get_object',
-                Params={'Bucket': self.bucket_name, 'Key': object_key},
-                ExpiresIn=3600
-            )
+            with timed('s3_sign'):
+                url = self.s3_client.generate_presigned_url(
+                    'get_object',
+                    Params={'Bucket': self.bucket_name, 'Key': object_key},
+                    ExpiresIn=Config.PRESIGNED_URL_EXPIRES_IN
+                )
             return url
         except Exception as e:
             raise HTTPException(status_code=500, detail=f"Failed to get presigned GET url: {str(e)}")
+
+    def get_public_presigned_get_url(self, object_key: str) -> str:
+        url = self.url_cache.get(object_key)
+        if url is None:
+            url = self.get_public_s3_url(self.generate_presigned_get_url(object_key))
+            self.url_cache.set(object_key, url)
+        return url
     
     def generate_presigned_put_url(self, object_key: str, content_type: str = 'image/jpeg', expires_in: int = 3600) -> str:
         try:
-            url = self.s3_client.generate_presigned_url(
-                'put_object',
-                Params={'Bucket': self.bucket_name, 'Key': object_key, 'ContentType': content_type},
-                ExpiresIn=expires_in
-            )
+            with timed('s3_sign'):
+                url = self.s3_client.generate_presigned_url(
+                    'put_object',
+                    Params={'Bucket': self.bucket_name, 'Key': object_key, 'ContentType': content_type},
+                    ExpiresIn=expires_in
+                )
             return url
         except Exception as e:
             raise HTTPException(status_code=500, detail=f"Failed to get presigned PUT url: {str(e)}")
 
+    def generate_presigned_upload(self, filename: str, content_type: str) -> Dict[str, Any]:
+        try:
+            object_key = f"uploads/{self.clean_filename(filename)}"
+            with timed('s3_sign'):
+                post = self.s3_client.generate_presigned_post(
+                    Bucket=self.bucket_name,
+                    Key=object_key,
+                    Fields={'Content-Type': content_type},
+                    Conditions=[
+                        {'Content-Type': content_type},
+                        ['content-length-range', 1, Config.UPLOAD_MAX_SIZE]
+                    ],
+                    ExpiresIn=Config.PRESIGNED_UPLOAD_EXPIRES_IN
+                )
+            # The POST policy does not sign the host, so the public endpoint can be handed out
+            return {
+                "storage_path": object_key,
+                "url": self.get_public_s3_url(post['url']),
+                "fields": post['fields'],
+                "expires_in": Config.PRESIGNED_UPLOAD_EXPIRES_IN
+            }
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"Failed to get presigned upload: {str(e)}")
+
+    async def object_size(self, object_key: str) -> Optional[int]:
+        """Size in bytes of a stored object, None if it does not exist."""
+        try:
+            with timed('s3_head'):
+                head = await run_in_threadpool(self.s3_client.head_object, Bucket=self.bucket_name, Key=object_key)
+            return head['ContentLength']
+        except ClientError as e:
+            if e.response.get('Error', {}).get('Code') in ('404', 'NoSuchKey', 'NotFound'):
+                return None
+            raise HTTPException(status_code=500, detail=f"Failed to check uploaded file: {str(e)}")
+
 s3_client = S3Client() 
\ No newline at end of file
@@ -3,12 +3,32 @@ from typing import List, Dict, Any, Optional
 
 class ImageDetectionResultSchema(BaseModel):
     image_id: int
-    detected_objects: List[Dict[str, Any]]
-    is_nsfw: bool
-    detected_nsfw: List[Dict[str, Any]]
-    processed_image_path: str
+    # None for analyses that were not run
+    detected_objects: Optional[List[Dict[str, Any]]] = None
+    is_nsfw: Optional[bool] = None
+    detected_nsfw: Optional[List[Dict[str, Any]]] = None
+    processed_image_path: Optional[str] = None
+    content_hash: Optional[str] = None
+    analyses: Optional[List[str]] = None
+    width: Optional[int] = None
+    height: Optional[int] = None
+    derivatives: Optional[Dict[str, str]] = None
+
+class BulkDetectionResultSchema(BaseModel):
+    results: List[ImageDetectionResultSchema]
 
 class ProcessedPresignedUrlSchema(BaseModel):
     storage_path: str
     content_type: str
     expires_in: Optional[int] = 3600
+
+class PresignedUploadRequestSchema(BaseModel):
+    filename: str
+    content_type: str = 'application/octet-stream'
+
+class FinalizeUploadSchema(BaseModel):
+    storage_path: str
+    name: str
+    analyses: Optional[List[str]] = None
+    stop_on_nsfw: bool = False
+    priority: Optional[str] = None
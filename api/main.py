@@ -1,8 +1,19 @@
-from fastapi import FastAPI
+import logging
+import time
+from fastapi import FastAPI, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
+from sqlalchemy import text
+from core.config import Config
 from core.dbutils import engine, Base
+from core.migrations import upgrade_schema, upgrade_indexes
+from core.metrics import request_seconds, render_metrics
+from core.rabbitmq import rabbitmq_client
+from core.events import event_broker
+from core.s3utils import s3_client
 from routers.images import router as images_router
 
+logging.basicConfig(level=Config.LOG_LEVEL.upper())
+
 app = FastAPI(title="Simple FastAPI App")
 origins = ["*"]
 
@@ -16,10 +27,33 @@ app.add_middleware(
 
 app.include_router(images_router)
 
+@app.middleware("http")
+async def record_request_time(request: Request, call_next):
+    started = time.perf_counter()
+    response = await call_next(request)
+    # Labelled by route template, so /images/{image_id} is one series rather than one per id
+    route = request.scope.get("route")
+    request_seconds.labels(
+        request.method,
+        route.path if route is not None else "unmatched",
+        response.status_code
+    ).observe(time.perf_counter() - started)
+    return response
+
 @app.on_event("startup")
 async def startup_event():
     async with engine.begin() as conn:
+        await conn.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
         await conn.run_sync(Base.metadata.create_all)
+        await upgrade_schema(conn)
+    await upgrade_indexes(engine)
+    await rabbitmq_client.connect()
+    await event_broker.connect()
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    await event_broker.close()
+    await rabbitmq_client.close()
 
 @app.get("/")
 async def read_root():
@@ -30,9 +64,16 @@ async def health_check():
     return {
         "status": "healthy",
         "version": "1.0.0",
-        "message": "API is running successfully"
+        "message": "API is running successfully",
+        "presigned_url_cache": s3_client.url_cache.stats(),
+        "event_subscribers": event_broker.subscriber_count
     }
 
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    body, content_type = render_metrics()
+    return Response(content=body, media_type=content_type)
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000) 
\ No newline at end of file
@@ -1,20 +1,45 @@
-from fastapi import APIRouter, UploadFile, File, HTTPException, Depends, Query
+import asyncio
+from typing import List
+from fastapi import APIRouter, UploadFile, File, Form, HTTPException, Depends, Query, Request
+from fastapi.responses import StreamingResponse
+from starlette.concurrency import run_in_threadpool
+from core.config import Config
 from core.s3utils import s3_client
 from core.dbutils import get_db
 from core import models, schemas
-from core.rabbitmq import RabbitMQClient
+from core.rabbitmq import rabbitmq_client
+from core.events import event_broker, image_processed_event
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import update, select, func
-from services.images import format_image_row
+from sqlalchemy import insert, update, select, tuple_, null
+from services.images import (
+    format_image_row,
+    compute_content_hash,
+    find_processed_duplicate,
+    find_processed_duplicates,
+    copy_processed_results,
+    build_processing_message,
+    parse_analyses,
+    parse_priority,
+    count_images,
+    search_filter,
+    decode_cursor,
+    encode_cursor,
+)
+from services.events import parse_image_ids, image_event_stream
+from services.uploads import spool_upload
+from services.results import apply_results
 
 router = APIRouter(prefix="/images", tags=["images"])
 
 
 def validate_image_type(file: UploadFile) -> str:
+    return validate_image_filename(file.filename)
+
+def validate_image_filename(filename: str) -> str:
     ALLOWED_EXTENSIONS = ['.jpg', '.jpeg', '.png', '.webp']
 
     # Get file extension
-    file_ext = "." + file.filename.split(".")[-1].lower()
+    file_ext = "." + filename.split(".")[-1].lower()
     
     if file_ext not in ALLOWED_EXTENSIONS:
         raise HTTPException(
@@ -27,26 +52,231 @@ def validate_image_type(file: UploadFile) -> str:
 @router.post("/upload")
 async def upload_image(
     file: UploadFile = File(...),
+    analyses: str = Form(None, description="Comma separated subset of nsfw, objects, annotate; all by default"),
+    stop_on_nsfw: bool = Form(False, description="Skip object detection and annotation for images flagged NSFW"),
+    priority: str = Form(None, description="Processing tier: interactive (default) or bulk"),
     db: AsyncSession = Depends(get_db)
 ):
     validate_image_type(file)
-    s3_object_key = s3_client.upload_file(file.file, file.content_type, file.filename)
+    analyses = parse_analyses(analyses)
+    priority = parse_priority(priority, "interactive")
+    content_hash = await run_in_threadpool(compute_content_hash, file.file)
+
+    # Identical content that was already analysed: reuse the stored results and skip the worker
+    duplicate = await find_processed_duplicate(db, content_hash, analyses, stop_on_nsfw)
+    if duplicate:
+        image = models.Image(
+            name=file.filename,
+            content_hash=content_hash,
+            **copy_processed_results(duplicate)
+        )
+        db.add(image)
+        await db.commit()
+        await db.refresh(image)
+        await event_broker.publish([image_processed_event(image.image_id, image.is_nsfw)])
+        return {
+            "image_id": image.image_id,
+            "name": image.name
+        }
+
+    s3_object_key = await s3_client.upload_file(file.file, file.content_type, file.filename)
     image = models.Image(
         name=file.filename,
-        storage_path=s3_object_key
+        storage_path=s3_object_key,
+        content_hash=content_hash,
+        analyses=analyses
     )
     
     db.add(image)
     await db.commit()
     await db.refresh(image)
     
-    message = {
+    message = build_processing_message(image, stop_on_nsfw, priority, file.size)
+    await rabbitmq_client.publish_message(message)
+    
+    return {
         "image_id": image.image_id,
-        "storage_path": image.storage_path
+        "name": image.name
     }
-    rabbitmq_client = RabbitMQClient()
-    rabbitmq_client.publish_message(message)
-    
+
+@router.post("/upload/batch")
+async def upload_images_batch(
+    files: List[UploadFile] = File(..., description="Images, or zip/tar archives of images"),
+    analyses: str = Form(None, description="Comma separated subset of nsfw, objects, annotate; all by default"),
+    stop_on_nsfw: bool = Form(False, description="Skip object detection and annotation for images flagged NSFW"),
+    priority: str = Form(None, description="Processing tier: bulk (default) or interactive"),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Upload many images at once. All rows are inserted in one transaction and
+    all processing messages are published together; files that cannot be
+    used are reported in skipped instead of failing the batch.
+    """
+    analyses = parse_analyses(analyses)
+    # Batches are imports by default, so they queue behind interactive uploads
+    priority = parse_priority(priority, "bulk")
+    loop = asyncio.get_running_loop()
+    spooled = asyncio.Queue()
+    semaphore = asyncio.Semaphore(Config.BATCH_UPLOAD_CONCURRENCY)
+    items = []
+    skipped = []
+    duplicates = {}
+    # Each distinct new content is stored once, however often it appears in the batch
+    to_store = {}
+    uploads = {}
+
+    async def store(item):
+        async with semaphore:
+            return await s3_client.upload_file(item.file, item.content_type, item.name)
+
+    async def read_files():
+        try:
+            for file in files:
+                file_items, file_skipped = await run_in_threadpool(
+                    spool_upload, file.file, file.filename, Config.BATCH_UPLOAD_MAX_FILES - len(items),
+                    lambda item: loop.call_soon_threadsafe(spooled.put_nowait, item)
+                )
+                items.extend(file_items)
+                skipped.extend(file_skipped)
+        finally:
+            loop.call_soon_threadsafe(spooled.put_nowait, None)
+
+    async def start_uploads():
+        # Storage uploads start while the rest of the archive is still being read;
+        # the items spooled meanwhile are checked for duplicates with one query
+        done = False
+        while not done:
+            chunk = [await spooled.get()]
+            while not spooled.empty():
+                chunk.append(spooled.get_nowait())
+            done = chunk[-1] is None
+            chunk = [item for item in chunk if item is not None]
+            unseen = {item.content_hash for item in chunk} - duplicates.keys() - to_store.keys()
+            duplicates.update(await find_processed_duplicates(db, unseen, analyses, stop_on_nsfw))
+            for item in chunk:
+                if item.content_hash not in duplicates and item.content_hash not in to_store:
+                    to_store[item.content_hash] = item
+                    uploads[item.content_hash] = asyncio.create_task(store(item))
+
+    try:
+        for outcome in await asyncio.gather(read_files(), start_uploads(), return_exceptions=True):
+            if isinstance(outcome, BaseException):
+                raise outcome
+
+        stored = await asyncio.gather(*uploads.values(), return_exceptions=True)
+        storage_paths = {}
+        for content_hash, result in zip(uploads, stored):
+            if isinstance(result, Exception):
+                skipped.append({"name": to_store[content_hash].name, "reason": "failed to store the file"})
+            else:
+                storage_paths[content_hash] = result
+    finally:
+        for upload in uploads.values():
+            upload.cancel()
+        await asyncio.gather(*uploads.values(), return_exceptions=True)
+        for item in items:
+            item.file.close()
+
+    # New and duplicate rows share the columns of a processed copy, so they go
+    # in one multi-row INSERT; absent values are SQL NULL rather than JSON null
+    rows = []
+    sizes = []
+    for item in items:
+        if item.content_hash in duplicates:
+            results = copy_processed_results(duplicates[item.content_hash])
+        elif item.content_hash in storage_paths:
+            results = {
+                "storage_path": storage_paths[item.content_hash],
+                "is_processed": False,
+                "is_nsfw": None,
+                "detected_objects": None,
+                "detected_nsfw": None,
+                "processed_image_path": None,
+                "analyses": analyses,
+                "width": None,
+                "height": None,
+                "derivatives": None,
+            }
+            sizes.append(item.size)
+        else:
+            continue
+        rows.append({"name": item.name, "content_hash": item.content_hash, **results})
+
+    image_ids = []
+    if rows:
+        result = await db.execute(
+            insert(models.Image)
+            .values([{key: null() if value is None else value for key, value in row.items()} for row in rows])
+            .returning(models.Image.image_id)
+        )
+        # Ids come from the sequence in VALUES order
+        image_ids = sorted(result.scalars().all())
+    await db.commit()
+
+    new = [(image_id, row) for image_id, row in zip(image_ids, rows) if not row["is_processed"]]
+    messages = [
+        build_processing_message(
+            models.Image(image_id=image_id, storage_path=row["storage_path"], content_hash=row["content_hash"], analyses=analyses),
+            stop_on_nsfw,
+            priority,
+            size
+        )
+        for (image_id, row), size in zip(new, sizes)
+    ]
+    if messages:
+        await rabbitmq_client.publish_messages(messages)
+    await event_broker.publish([
+        image_processed_event(image_id, row["is_nsfw"])
+        for image_id, row in zip(image_ids, rows) if row["is_processed"]
+    ])
+
+    images = [
+        {"image_id": image_id, "name": row["name"]}
+        for image_id, row in zip(image_ids, rows)
+    ]
+    return {
+        "image_ids": image_ids,
+        "images": images,
+        "skipped": skipped
+    }
+
+@router.post("/upload_url")
+async def get_upload_url(info: schemas.PresignedUploadRequestSchema):
+    """First step of a direct upload: a presigned POST the client sends the file to."""
+    validate_image_filename(info.filename)
+    return s3_client.generate_presigned_upload(info.filename, info.content_type)
+
+@router.post("/upload/finalize")
+async def finalize_upload(
+    info: schemas.FinalizeUploadSchema,
+    db: AsyncSession = Depends(get_db)
+):
+    """Second step of a direct upload: register the stored file and queue it for processing."""
+    validate_image_filename(info.name)
+    analyses = parse_analyses(info.analyses)
+    priority = parse_priority(info.priority, "interactive")
+    if not info.storage_path.startswith("uploads/"):
+        raise HTTPException(status_code=400, detail="Invalid storage path")
+
+    existing = await db.execute(select(models.Image.image_id).where(models.Image.storage_path == info.storage_path))
+    if existing.first():
+        raise HTTPException(status_code=409, detail="Upload already finalized")
+    size = await s3_client.object_size(info.storage_path)
+    if size is None:
+        raise HTTPException(status_code=404, detail="Uploaded file not found")
+
+    # The API never sees the bytes; the worker hashes the file and reports the hash with its results
+    image = models.Image(
+        name=info.name,
+        storage_path=info.storage_path,
+        analyses=analyses
+    )
+    db.add(image)
+    await db.commit()
+    await db.refresh(image)
+
+    await rabbitmq_client.publish_message(build_processing_message(image, info.stop_on_nsfw, priority, size))
+
     return {
         "image_id": image.image_id,
         "name": image.name
@@ -57,32 +287,52 @@ async def get_image_list(
     page: int = Query(1, ge=1),
     limit: int = Query(10, ge=1, le=100),
     search: str = Query(None),
+    cursor: str = Query(None, description="next_cursor of the previous page; replaces page"),
+    include_total: bool = Query(True, description="Include the (cached) total count"),
     db: AsyncSession = Depends(get_db),
 ):
-    offset = (page - 1) * limit
-
     query = select(models.Image)
     if search:
-        query = query.where(models.Image.name.ilike(f"%{search}%"))
+        query = query.where(search_filter(search))
     
-    query = query.order_by(models.Image.created_at.desc()).offset(offset).limit(limit)
+    if cursor:
+        # Keyset pagination: seek past the last row of the previous page using the index
+        created_at, image_id = decode_cursor(cursor)
+        query = query.where(tuple_(models.Image.created_at, models.Image.image_id) < tuple_(created_at, image_id))
+    else:
+        query = query.offset((page - 1) * limit)
+    
+    # One extra row tells whether there is a next page
+    query = query.order_by(models.Image.created_at.desc(), models.Image.image_id.desc()).limit(limit + 1)
     result = await db.execute(query)
     images = result.scalars().all()
+    next_cursor = encode_cursor(images[limit - 1]) if len(images) > limit else None
+    images = images[:limit]
 
-    count_query = select(func.count()).select_from(models.Image)
-    if search:
-        count_query = count_query.where(models.Image.name.ilike(f"%{search}%"))
-    total_result = await db.execute(count_query)
-    total = total_result.scalar()
+    total = await count_images(db, search) if include_total else None
 
     return {
         "page": page,
         "limit": limit,
         "total": total,
+        "next_cursor": next_cursor,
         "data": [format_image_row(image) for image in images]
     }
 
 
+@router.get("/events")
+async def stream_image_events(
+    request: Request,
+    image_ids: str = Query(None, description="Comma separated image ids to follow; all images by default"),
+):
+    """Server-Sent Events stream with an `image.processed` event whenever an image gets its results."""
+    return StreamingResponse(
+        image_event_stream(request, parse_image_ids(image_ids)),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
 @router.get("/{image_id}")
 async def get_image(
     image_id: int,
@@ -101,28 +351,61 @@ async def update_detection_result(
     results: schemas.ImageDetectionResultSchema,
     db: AsyncSession = Depends(get_db)
 ):
-    image = await db.get(models.Image, image_id)
-    if not image:
-        raise HTTPException(status_code=404, detail="Image not found")
-    
     stmt = (
         update(models.Image)
         .where(models.Image.image_id == image_id)
         .values(
             is_processed=True,
-            detected_objects=results.detected_objects,
-            is_nsfw=results.is_nsfw,
-            detected_nsfw=results.detected_nsfw,
             processed_image_path=results.processed_image_path
         )
+        .returning(models.Image.image_id)
     )
+    # None means the analysis was not run, so an earlier result is kept
+    if results.detected_objects is not None:
+        stmt = stmt.values(detected_objects=results.detected_objects)
+    if results.is_nsfw is not None:
+        stmt = stmt.values(is_nsfw=results.is_nsfw, detected_nsfw=results.detected_nsfw)
+    if results.content_hash:
+        stmt = stmt.values(content_hash=results.content_hash)
+    if results.analyses is not None:
+        stmt = stmt.values(analyses=results.analyses)
+    if results.width and results.height:
+        stmt = stmt.values(width=results.width, height=results.height)
+    if results.derivatives:
+        stmt = stmt.values(derivatives=results.derivatives)
     
-    await db.execute(stmt)
+    result = await db.execute(stmt)
+    if result.first() is None:
+        await db.rollback()
+        raise HTTPException(status_code=404, detail="Image not found")
     await db.commit()
+    await event_broker.publish([image_processed_event(image_id, results.is_nsfw)])
     
     return {"message": "Detection results updated successfully"}
 
 
+@router.post("/detection_results")
+async def update_detection_results_bulk(
+    payload: schemas.BulkDetectionResultSchema,
+    db: AsyncSession = Depends(get_db)
+):
+    """Apply results for many images with a single UPDATE ... FROM (VALUES ...) in one transaction."""
+    if not payload.results:
+        return {"updated": [], "missing": []}
+
+    updated = await apply_results(db, payload.results)
+    # One fanout message for the whole flush
+    await event_broker.publish([
+        image_processed_event(item.image_id, item.is_nsfw)
+        for item in payload.results if item.image_id in updated
+    ])
+
+    return {
+        "updated": sorted(updated),
+        "missing": sorted({item.image_id for item in payload.results} - updated)
+    }
+
+
 @router.post("/{image_id}/processed_presigned_url")
 async def get_processed_presigned_url(
     image_id: int,
@@ -0,0 +1,148 @@
+"""
+Drop the annotated copies under processed/ once the worker runs with
+WORKER_OUTPUT_MODE=vector and clients draw the boxes from `overlay`.
+
+Images still pointing at a copy are handled in batches by image_id. If the
+original's size is not known yet, it is read from the first bytes of the
+upload. The size is stored, processed_image_path is cleared on every row
+sharing the copy (duplicate uploads reuse it), and the copies are deleted
+from storage in bulk. Images whose original cannot be read keep their copy.
+
+Run from the api directory:
+    python -m scripts.drop_processed_copies --dry-run
+    python -m scripts.drop_processed_copies --batch-size 500 --concurrency 16
+"""
+import argparse
+import asyncio
+import logging
+from io import BytesIO
+from PIL import Image
+from sqlalchemy import select, update, values, column, func, Integer, String
+from core.dbutils import async_session, engine
+from core.s3utils import s3_client
+from core import models
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Enough for the size of nearly every JPEG, PNG and WebP; the whole file is read otherwise
+HEADER_BYTES = 256 * 1024
+# Limit of one DeleteObjects request
+DELETE_BATCH_SIZE = 1000
+
+
+def read_image_size(storage_path: str) -> tuple:
+    for byte_range in (f"bytes=0-{HEADER_BYTES - 1}", None):
+        params = {'Bucket': s3_client.bucket_name, 'Key': storage_path}
+        if byte_range:
+            params['Range'] = byte_range
+        data = s3_client.s3_client.get_object(**params)['Body'].read()
+        try:
+            return Image.open(BytesIO(data)).size
+        except Exception:
+            if byte_range is None:
+                raise
+
+
+def delete_objects(keys: list) -> None:
+    for start in range(0, len(keys), DELETE_BATCH_SIZE):
+        s3_client.s3_client.delete_objects(
+            Bucket=s3_client.bucket_name,
+            Delete={'Objects': [{'Key': key} for key in keys[start:start + DELETE_BATCH_SIZE]], 'Quiet': True}
+        )
+
+
+async def resolve_sizes(rows, concurrency: int) -> dict:
+    """Size of the original behind each processed copy, skipping originals that cannot be read."""
+    sizes = {}
+    missing = {}
+    for row in rows:
+        if row.width and row.height:
+            sizes[row.processed_image_path] = (row.width, row.height)
+        else:
+            missing.setdefault(row.processed_image_path, row.storage_path)
+
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def read(processed_image_path: str, storage_path: str) -> None:
+        async with semaphore:
+            try:
+                sizes[processed_image_path] = await asyncio.to_thread(read_image_size, storage_path)
+            except Exception as e:
+                logger.warning(f"Keeping {processed_image_path}, cannot read size of {storage_path}: {e}")
+
+    await asyncio.gather(*[read(path, storage_path) for path, storage_path in missing.items() if path not in sizes])
+    return sizes
+
+
+async def drop_processed_copies(batch_size: int, concurrency: int, dry_run: bool) -> int:
+    dropped = 0
+    last_id = 0
+    while True:
+        async with async_session() as db:
+            result = await db.execute(
+                select(
+                    models.Image.image_id,
+                    models.Image.storage_path,
+                    models.Image.processed_image_path,
+                    models.Image.width,
+                    models.Image.height
+                )
+                .where(models.Image.processed_image_path.isnot(None), models.Image.image_id > last_id)
+                .order_by(models.Image.image_id)
+                .limit(batch_size)
+            )
+            rows = result.all()
+            if not rows:
+                break
+            last_id = rows[-1].image_id
+
+            sizes = await resolve_sizes(rows, concurrency)
+            if not sizes:
+                continue
+            if dry_run:
+                logger.info(f"Would drop {len(sizes)} processed copies up to image {last_id}")
+                dropped += len(sizes)
+                continue
+
+            copies = values(
+                column("processed_image_path", String),
+                column("width", Integer),
+                column("height", Integer),
+                name="copies"
+            ).data([(path, width, height) for path, (width, height) in sizes.items()])
+            await db.execute(
+                update(models.Image)
+                .where(models.Image.processed_image_path == copies.c.processed_image_path)
+                .values(
+                    processed_image_path=None,
+                    width=func.coalesce(models.Image.width, copies.c.width),
+                    height=func.coalesce(models.Image.height, copies.c.height)
+                )
+                .execution_options(synchronize_session=False)
+            )
+            await db.commit()
+
+        # Rows no longer reference the copies, so they can go
+        await asyncio.to_thread(delete_objects, list(sizes))
+        dropped += len(sizes)
+        logger.info(f"Dropped {len(sizes)} processed copies up to image {last_id}")
+    return dropped
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--batch-size', type=int, default=500)
+    parser.add_argument('--concurrency', type=int, default=16, help='Originals read at once to get missing sizes')
+    parser.add_argument('--dry-run', action='store_true', help='Only report what would be dropped')
+    args = parser.parse_args()
+
+    try:
+        dropped = await drop_processed_copies(args.batch_size, args.concurrency, args.dry_run)
+    finally:
+        await engine.dispose()
+    logger.info(f"{'Would drop' if args.dry_run else 'Dropped'} {dropped} processed copies in total")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
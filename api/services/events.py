@@ -0,0 +1,37 @@
+import asyncio
+import json
+from fastapi import Request, HTTPException
+from core.config import Config
+from core.events import event_broker
+
+
+def parse_image_ids(image_ids: str) -> set:
+    if not image_ids:
+        return set()
+    try:
+        return {int(image_id) for image_id in image_ids.split(",") if image_id.strip()}
+    except ValueError:
+        raise HTTPException(status_code=400, detail="image_ids must be comma separated integers")
+
+
+def format_sse(event: dict) -> str:
+    return f"event: {event['type']}\ndata: {json.dumps(event)}\n\n"
+
+
+async def image_event_stream(request: Request, image_ids: set):
+    """Server-Sent Events for this replica's share of the fanout, filtered to `image_ids` when given."""
+    async with event_broker.subscribe() as queue:
+        # Reconnect delay for EventSource after the stream drops
+        yield f"retry: {Config.EVENTS_RETRY_MS}\n\n"
+        while True:
+            try:
+                event = await asyncio.wait_for(queue.get(), Config.EVENTS_HEARTBEAT_INTERVAL)
+            except asyncio.TimeoutError:
+                if await request.is_disconnected():
+                    break
+                # A comment line keeps proxies from closing an idle stream
+                yield ": keep-alive\n\n"
+                continue
+            if image_ids and event.get("image_id") not in image_ids:
+                continue
+            yield format_sse(event)
@@ -1,5 +1,53 @@
+import base64
+import hashlib
+import json
+from datetime import datetime
+from fastapi import HTTPException
 from core.s3utils import s3_client
+from core.cache import TTLCache
+from core.config import Config
 from core import models
+from core.rabbitmq import PRIORITIES
+from sqlalchemy import select, func, or_, and_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+HASH_CHUNK_SIZE = 1024 * 1024
+
+# Analyses a caller can ask for; annotate draws the boxes of the others onto a processed copy
+ANALYSES = ('nsfw', 'objects', 'annotate')
+
+# Exact totals for /images/list, keyed by search term
+count_cache = TTLCache(max_size=1000, ttl=Config.IMAGE_COUNT_CACHE_TTL)
+
+def normalize_xyxy(box, width: int, height: int) -> list:
+    return [round(box[0] / width, 6), round(box[1] / height, 6), round(box[2] / width, 6), round(box[3] / height, 6)]
+
+
+def build_overlay(image: models.Image):
+    """
+    Box geometry relative to the original image ([x1, y1, x2, y2] in 0..1 for
+    both detectors), so clients can draw it over the input image instead of
+    loading a processed copy. None until the image size is known.
+    """
+    if not image.width or not image.height:
+        return None
+    return {
+        "width": image.width,
+        "height": image.height,
+        "objects": [
+            {**detection, "box": normalize_xyxy(detection["box"], image.width, image.height)}
+            for detection in image.detected_objects or []
+        ],
+        "nsfw": [
+            # NudeNet boxes are [x, y, width, height]
+            {**detection, "box": normalize_xyxy(
+                [detection["box"][0], detection["box"][1], detection["box"][0] + detection["box"][2], detection["box"][1] + detection["box"][3]],
+                image.width, image.height
+            )}
+            for detection in image.detected_nsfw or []
+        ],
+    }
+
 
 def format_image_row(image: models.Image) -> dict:
     item = {
@@ -7,11 +55,158 @@ def format_image_row(image: models.Image) -> dict:
         "name": image.name,
         "is_processed": image.is_processed,
         "is_nsfw": image.is_nsfw,
-        "input_image_url": s3_client.get_public_s3_url(s3_client.generate_presigned_get_url(image.storage_path)),
+        "input_image_url": s3_client.get_public_presigned_get_url(image.storage_path),
         "detected_nsfw": image.detected_nsfw,
         "detected_objects": image.detected_objects,
+        "analyses": image.analyses if image.analyses is not None else list(ANALYSES),
+        "width": image.width,
+        "height": image.height,
+        "overlay": build_overlay(image),
         "created_at": image.created_at,
         "updated_at": image.updated_at,
-        "output_image_url": s3_client.get_public_s3_url(s3_client.generate_presigned_get_url(image.processed_image_path)) if image.is_processed and image.processed_image_path else None
+        "output_image_url": s3_client.get_public_presigned_get_url(image.processed_image_path) if image.is_processed and image.processed_image_path else None,
+        # Small WebP copies (thumbnail, medium) for list views
+        "derivatives": {
+            name: s3_client.get_public_presigned_get_url(storage_path)
+            for name, storage_path in (image.derivatives or {}).items()
+        }
+    }
+    return item
+
+
+def build_processing_message(image: models.Image, stop_on_nsfw: bool = False, priority: str = "interactive", size: int = None) -> dict:
+    return {
+        "image_id": image.image_id,
+        "storage_path": image.storage_path,
+        "content_hash": image.content_hash,
+        "analyses": image.analyses,
+        "stop_on_nsfw": stop_on_nsfw,
+        # Used by RabbitMQClient to pick the queue of the message's tier
+        "priority": priority,
+        "size": size
     }
-    return item
\ No newline at end of file
+
+
+def parse_priority(priority: str, default: str) -> str:
+    priority = (priority or default).lower()
+    if priority not in PRIORITIES:
+        raise HTTPException(status_code=400, detail=f"Unknown priority: {priority}. Allowed: {', '.join(PRIORITIES)}")
+    return priority
+
+
+def parse_analyses(analyses) -> list:
+    """
+    Normalise a requested analysis set, given as a list or a comma separated
+    string. Nothing requested means all of them.
+    """
+    if isinstance(analyses, str):
+        analyses = [name.strip() for name in analyses.split(",")]
+    requested = {name.lower() for name in analyses or [] if name}
+    if not requested:
+        return list(ANALYSES)
+    unknown = requested - set(ANALYSES)
+    if unknown:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown analyses: {', '.join(sorted(unknown))}. Allowed: {', '.join(ANALYSES)}"
+        )
+    if requested == {"annotate"}:
+        raise HTTPException(status_code=400, detail="annotate needs nsfw or objects")
+    return [name for name in ANALYSES if name in requested]
+
+
+def compute_content_hash(file_obj) -> str:
+    sha256 = hashlib.sha256()
+    for chunk in iter(lambda: file_obj.read(HASH_CHUNK_SIZE), b""):
+        sha256.update(chunk)
+    file_obj.seek(0)
+    return sha256.hexdigest()
+
+
+def covers_analyses(analyses: list, stop_on_nsfw: bool = False):
+    """Condition for rows whose analyses cover the requested ones."""
+    covered = models.Image.analyses.contains(analyses)
+    if stop_on_nsfw and "nsfw" in analyses:
+        # Under the early exit rule a flagged image only ever gets its NSFW verdict
+        covered = or_(covered, and_(models.Image.is_nsfw.is_(True), models.Image.analyses.contains(["nsfw"])))
+    return or_(models.Image.analyses.is_(None), covered)
+
+
+async def find_processed_duplicate(db: AsyncSession, content_hash: str, analyses: list, stop_on_nsfw: bool = False):
+    """Latest processed image with the same content whose analyses cover the requested ones."""
+    query = (
+        select(models.Image)
+        .where(
+            models.Image.content_hash == content_hash,
+            models.Image.is_processed.is_(True),
+            covers_analyses(analyses, stop_on_nsfw)
+        )
+        .order_by(models.Image.image_id.desc())
+        .limit(1)
+    )
+    result = await db.execute(query)
+    return result.scalars().first()
+
+
+async def find_processed_duplicates(db: AsyncSession, content_hashes, analyses: list, stop_on_nsfw: bool = False) -> dict:
+    """find_processed_duplicate for many hashes in one query, by content hash."""
+    if not content_hashes:
+        return {}
+    query = (
+        select(models.Image)
+        .where(
+            models.Image.content_hash.in_(list(content_hashes)),
+            models.Image.is_processed.is_(True),
+            covers_analyses(analyses, stop_on_nsfw)
+        )
+        .order_by(models.Image.content_hash, models.Image.image_id.desc())
+        .distinct(models.Image.content_hash)
+    )
+    result = await db.execute(query)
+    return {image.content_hash: image for image in result.scalars().all()}
+
+
+def copy_processed_results(duplicate: models.Image) -> dict:
+    """Column values that let a new row reuse the results of an identical processed image."""
+    return {
+        "storage_path": duplicate.storage_path,
+        "is_processed": True,
+        "is_nsfw": duplicate.is_nsfw,
+        "detected_objects": duplicate.detected_objects,
+        "detected_nsfw": duplicate.detected_nsfw,
+        "processed_image_path": duplicate.processed_image_path,
+        "analyses": duplicate.analyses,
+        "width": duplicate.width,
+        "height": duplicate.height,
+        "derivatives": duplicate.derivatives,
+    }
+
+
+def encode_cursor(image: models.Image) -> str:
+    payload = json.dumps({"created_at": image.created_at.isoformat(), "image_id": image.image_id})
+    return base64.urlsafe_b64encode(payload.encode()).decode()
+
+
+def decode_cursor(cursor: str) -> tuple:
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return datetime.fromisoformat(payload["created_at"]), int(payload["image_id"])
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def search_filter(search: str):
+    return models.Image.name.ilike(f"%{search}%")
+
+
+async def count_images(db: AsyncSession, search: str = None) -> int:
+    key = search or ""
+    total = count_cache.get(key)
+    if total is None:
+        count_query = select(func.count()).select_from(models.Image)
+        if search:
+            count_query = count_query.where(search_filter(search))
+        total_result = await db.execute(count_query)
+        total = total_result.scalar()
+        count_cache.set(key, total)
+    return total
@@ -0,0 +1,73 @@
+from sqlalchemy import update, values, column, func, cast, Integer, String, Boolean, JSON
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.ext.asyncio import AsyncSession
+from core import models
+
+
+def bulk_results_update(results: list):
+    """
+    A single UPDATE ... FROM (VALUES ...) applying the results of many images.
+    Columns a result leaves out (None) keep their stored value, except the
+    processed image path: the results of analyses that were not run, content
+    hash, analyses, size and derivatives.
+    """
+    # none_as_null binds None as SQL NULL; otherwise it becomes the JSON value
+    # 'null', which coalesce() would never fall through and would store as is
+    rows = values(
+        column("image_id", Integer),
+        column("detected_objects", JSON(none_as_null=True)),
+        column("is_nsfw", Boolean),
+        column("detected_nsfw", JSON(none_as_null=True)),
+        column("processed_image_path", String),
+        column("content_hash", String),
+        column("analyses", JSONB(none_as_null=True)),
+        column("width", Integer),
+        column("height", Integer),
+        column("derivatives", JSONB(none_as_null=True)),
+        name="results"
+    ).data([
+        (
+            item.image_id,
+            item.detected_objects,
+            item.is_nsfw,
+            item.detected_nsfw,
+            item.processed_image_path,
+            item.content_hash,
+            item.analyses,
+            item.width,
+            item.height,
+            item.derivatives
+        )
+        for item in results
+    ])
+    # A VALUES column that is NULL in every row is typed text by Postgres, as
+    # happens when a flush holds only nsfw-only or only objects-only results,
+    # so every column is cast back to the type of the column it sets
+    return (
+        update(models.Image)
+        .where(models.Image.image_id == cast(rows.c.image_id, Integer))
+        .values(
+            is_processed=True,
+            # None means the analysis was not run, so an earlier result is kept
+            detected_objects=func.coalesce(cast(rows.c.detected_objects, JSON), models.Image.detected_objects),
+            is_nsfw=func.coalesce(cast(rows.c.is_nsfw, Boolean), models.Image.is_nsfw),
+            detected_nsfw=func.coalesce(cast(rows.c.detected_nsfw, JSON), models.Image.detected_nsfw),
+            processed_image_path=cast(rows.c.processed_image_path, String),
+            content_hash=func.coalesce(cast(rows.c.content_hash, String), models.Image.content_hash),
+            # The worker reports what it actually ran, which is less than requested after an early exit
+            analyses=func.coalesce(cast(rows.c.analyses, JSONB), models.Image.analyses),
+            width=func.coalesce(cast(rows.c.width, Integer), models.Image.width),
+            height=func.coalesce(cast(rows.c.height, Integer), models.Image.height),
+            derivatives=func.coalesce(cast(rows.c.derivatives, JSONB), models.Image.derivatives)
+        )
+        .returning(models.Image.image_id)
+        .execution_options(synchronize_session=False)
+    )
+
+
+async def apply_results(db: AsyncSession, results: list) -> set:
+    """Write the results in one transaction. Returns the ids of the images that exist."""
+    result = await db.execute(bulk_results_update(results))
+    updated = set(result.scalars().all())
+    await db.commit()
+    return updated
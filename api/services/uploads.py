@@ -0,0 +1,124 @@
+import hashlib
+import mimetypes
+import os
+import tarfile
+import tempfile
+import zipfile
+from core.config import Config
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.webp')
+ARCHIVE_EXTENSIONS = ('.zip', '.tar', '.tar.gz', '.tgz')
+
+COPY_CHUNK_SIZE = 1024 * 1024
+
+
+class BatchItem:
+    """One image of a batch upload, spooled to memory or disk and hashed on the way."""
+
+    def __init__(self, name: str, file_obj, content_hash: str, size: int):
+        self.name = name
+        self.file = file_obj
+        self.content_hash = content_hash
+        self.size = size
+        self.content_type = mimetypes.guess_type(name)[0] or 'application/octet-stream'
+
+
+def is_archive(filename: str) -> bool:
+    return filename.lower().endswith(ARCHIVE_EXTENSIONS)
+
+
+def check_member_name(path: str):
+    """Display name of an archive member, or the reason it is skipped."""
+    name = os.path.basename(path)
+    if not name or name.startswith('.') or '__MACOSX/' in path:
+        return None, "not an image"
+    if not name.lower().endswith(IMAGE_EXTENSIONS):
+        return None, f"file type not allowed, allowed types: {', '.join(IMAGE_EXTENSIONS)}"
+    return name, None
+
+
+def spool(stream, max_size: int):
+    """Copy a stream into a spooled file while hashing it. Returns (file, sha256, size) or raises ValueError past max_size."""
+    target = tempfile.SpooledTemporaryFile(max_size=Config.BATCH_UPLOAD_SPOOL_SIZE)
+    sha256 = hashlib.sha256()
+    size = 0
+    try:
+        for chunk in iter(lambda: stream.read(COPY_CHUNK_SIZE), b""):
+            size += len(chunk)
+            if size > max_size:
+                raise ValueError(f"larger than {max_size} bytes")
+            sha256.update(chunk)
+            target.write(chunk)
+    except Exception:
+        target.close()
+        raise
+    target.seek(0)
+    return target, sha256.hexdigest(), size
+
+
+def iter_archive(file_obj, filename: str):
+    """(path, size, opener) for every regular file of a zip or tar archive."""
+    if filename.lower().endswith('.zip'):
+        with zipfile.ZipFile(file_obj) as archive:
+            for info in archive.infolist():
+                if not info.is_dir():
+                    yield info.filename, info.file_size, lambda info=info: archive.open(info)
+    else:
+        # Streaming mode reads members in order without seeking back
+        with tarfile.open(fileobj=file_obj, mode='r|*') as archive:
+            for member in archive:
+                if member.isfile():
+                    yield member.name, member.size, lambda member=member: archive.extractfile(member)
+
+
+def spool_upload(file_obj, filename: str, max_items: int, on_item=None) -> tuple:
+    """
+    Spool every image of one uploaded file, a single image or an archive,
+    keeping at most max_items. Returns (items, skipped) where skipped lists
+    {"name", "reason"}. Blocking: archives are read sequentially from the upload.
+    on_item is called with each item as soon as it is spooled.
+    """
+    items = []
+    skipped = []
+    too_many = f"more than {Config.BATCH_UPLOAD_MAX_FILES} images in the batch"
+    if not is_archive(filename):
+        name, reason = check_member_name(filename)
+        if reason is None and max_items < 1:
+            reason = too_many
+        if reason:
+            return items, [{"name": filename, "reason": reason}]
+        try:
+            spooled, content_hash, size = spool(file_obj, Config.UPLOAD_MAX_SIZE)
+            items.append(BatchItem(name, spooled, content_hash, size))
+            if on_item:
+                on_item(items[-1])
+        except ValueError as e:
+            skipped.append({"name": filename, "reason": str(e)})
+        return items, skipped
+
+    try:
+        for path, size, opener in iter_archive(file_obj, filename):
+            name, reason = check_member_name(path)
+            if reason is None and size > Config.UPLOAD_MAX_SIZE:
+                reason = f"larger than {Config.UPLOAD_MAX_SIZE} bytes"
+            if reason is None and len(items) >= max_items:
+                reason = too_many
+            if reason:
+                skipped.append({"name": path, "reason": reason})
+                continue
+            with opener() as stream:
+                try:
+                    spooled, content_hash, size = spool(stream, Config.UPLOAD_MAX_SIZE)
+                except ValueError as e:
+                    skipped.append({"name": path, "reason": str(e)})
+                    continue
+            items.append(BatchItem(name, spooled, content_hash, size))
+            if on_item:
+                on_item(items[-1])
+    except (zipfile.BadZipFile, tarfile.TarError) as e:
+        skipped.append({"name": filename, "reason": f"unreadable archive: {e}"})
+    except Exception:
+        for item in items:
+            item.file.close()
+        raise
+    return items, skipped
@@ -0,0 +1,63 @@
+"""
+Compare two results files of benchmarks.run and flag regressions.
+
+Exits with status 1 when a metric got worse by more than the threshold, so
+it can gate a CI job. Run from the repository root:
+    python -m benchmarks.compare benchmarks/results/before.json benchmarks/results/after.json
+    python -m benchmarks.compare before.json after.json --threshold 10
+"""
+import argparse
+import json
+import sys
+
+
+def load(path: str) -> dict:
+    with open(path) as f:
+        return json.load(f)
+
+
+def compare(baseline: dict, candidate: dict, threshold: float) -> list:
+    """(name, before, after, change %, regressed) for every metric present in both runs."""
+    rows = []
+    for name, before in baseline['metrics'].items():
+        after = candidate['metrics'].get(name)
+        if after is None:
+            continue
+        if before['value'] == 0:
+            change = 0.0 if after['value'] == 0 else float('inf')
+        else:
+            change = 100 * (after['value'] - before['value']) / abs(before['value'])
+        worse = -change if before['better'] == 'higher' else change
+        rows.append((name, before['value'], after['value'], change, worse > threshold))
+    return rows
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('baseline')
+    parser.add_argument('candidate')
+    parser.add_argument('--threshold', type=float, default=5.0, help='Percentage a metric may get worse before it counts as a regression')
+    args = parser.parse_args()
+
+    baseline = load(args.baseline)
+    candidate = load(args.candidate)
+    if baseline.get('params') != candidate.get('params'):
+        print("Warning: the runs used different parameters, differences may not be meaningful")
+    if baseline.get('machine') != candidate.get('machine'):
+        print("Warning: the runs come from different machines")
+
+    rows = compare(baseline, candidate, args.threshold)
+    print(f"{baseline.get('commit')} -> {candidate.get('commit')}")
+    print(f"{'metric':<48}{'before':>12}{'after':>12}{'change':>10}")
+    for name, before, after, change, regressed in rows:
+        flag = '  REGRESSION' if regressed else ''
+        print(f"{name:<48}{before:>12.2f}{after:>12.2f}{change:>9.1f}%{flag}")
+
+    regressions = [row for row in rows if row[4]]
+    if regressions:
+        print(f"{len(regressions)} metrics regressed by more than {args.threshold}%")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+"""
+Synthetic image corpus of mixed sizes and formats. The seed fixes the mix of
+sizes and formats, so runs with the same seed do the same amount of work. The
+pixel noise also depends on a per-run nonce: images are never byte-identical
+to those of an earlier run, so the API cannot answer an upload from stored
+results of the same content and every image goes through the worker.
+"""
+import os
+import numpy as np
+from worker.benchmarks.corpus import make_image
+
+# (width, height, weight): mostly phone photos, some screenshots and a few very large images
+SIZES = (
+    (640, 480, 2),
+    (1280, 720, 3),
+    (1920, 1080, 3),
+    (3024, 4032, 4),
+    (4032, 3024, 4),
+    (6000, 4000, 1),
+)
+FORMATS = (
+    ('jpg', 'JPEG', 7),
+    ('png', 'PNG', 1),
+    ('webp', 'WEBP', 2),
+)
+# Noisy PNGs barely compress; larger ones would exceed the API upload limit
+PNG_MAX_SIDE = 1920
+
+
+def pick(rng, choices: tuple):
+    weights = np.array([choice[-1] for choice in choices], dtype=np.float64)
+    return choices[rng.choice(len(choices), p=weights / weights.sum())]
+
+
+def build_corpus(directory: str, count: int, seed: int = 0, nonce: int = 0) -> list:
+    """
+    Paths of `count` images in `directory`, generating the missing ones. The
+    same seed gives the same sizes and formats; reuse a nonce only to upload
+    the same bytes again, which measures the duplicate shortcut.
+    """
+    os.makedirs(directory, exist_ok=True)
+    rng = np.random.default_rng(seed)
+    paths = []
+    for index in range(count):
+        width, height, _ = pick(rng, SIZES)
+        extension, pil_format, _ = pick(rng, FORMATS)
+        if extension == 'png' and max(width, height) > PNG_MAX_SIDE:
+            scale = PNG_MAX_SIDE / max(width, height)
+            width, height = int(width * scale), int(height * scale)
+        path = os.path.join(directory, f"{seed}_{nonce}_{index:05d}_{width}x{height}.{extension}")
+        if not os.path.exists(path):
+            with open(path, 'wb') as f:
+                f.write(make_image(width, height, pil_format, [seed, nonce, index]))
+        paths.append(path)
+    return paths
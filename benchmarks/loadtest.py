@@ -0,0 +1,193 @@
+"""
+End-to-end load test against a running stack (see docker-compose.yml).
+
+Uploads a synthetic corpus through POST /images/upload with a fixed number
+of concurrent clients and listens on GET /images/events to see when each
+image has its results. Worker throughput per core and peak RSS come from the
+Prometheus endpoints of the worker and the API.
+"""
+import asyncio
+import json
+import mimetypes
+import os
+import re
+import statistics
+import time
+import aiohttp
+
+LABEL_PATTERN = re.compile(r'(\w+)="([^"]*)"')
+
+
+def parse_metrics(text: str) -> list:
+    """(name, labels, value) for every sample of a Prometheus text exposition."""
+    samples = []
+    for line in text.splitlines():
+        if not line or line.startswith('#'):
+            continue
+        head, _, rest = line.rpartition('}') if '}' in line else ('', '', line)
+        if head:
+            name, _, labels = head.partition('{')
+            value = rest.split()[0]
+        else:
+            name, value = rest.split()[:2]
+            labels = ''
+        samples.append((name, dict(LABEL_PATTERN.findall(labels)), float(value)))
+    return samples
+
+
+def metric_value(samples: list, name: str, **labels) -> float:
+    return sum(
+        value for sample_name, sample_labels, value in samples
+        if sample_name == name and all(sample_labels.get(key) == wanted for key, wanted in labels.items())
+    )
+
+
+async def scrape(session: aiohttp.ClientSession, url: str) -> list:
+    async with session.get(url) as response:
+        response.raise_for_status()
+        return parse_metrics(await response.text())
+
+
+def percentile(values: list, fraction: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+class EventListener:
+    """Records when each image.processed event arrives on the API's event stream."""
+
+    def __init__(self, session: aiohttp.ClientSession, api_url: str):
+        self.session = session
+        self.api_url = api_url
+        self.processed_at = {}
+        self.connected = asyncio.Event()
+
+    async def run(self) -> None:
+        async with self.session.get(
+            f"{self.api_url}/images/events",
+            timeout=aiohttp.ClientTimeout(total=None, sock_read=None)
+        ) as response:
+            response.raise_for_status()
+            async for line in response.content:
+                line = line.decode().strip()
+                if line.startswith('retry:'):
+                    self.connected.set()
+                elif line.startswith('data:'):
+                    event = json.loads(line[len('data:'):])
+                    self.processed_at.setdefault(event['image_id'], time.perf_counter())
+
+
+class RssSampler:
+    """Peak resident memory across samples of each process_resident_memory_bytes endpoint."""
+
+    def __init__(self, session: aiohttp.ClientSession, urls: dict, interval: float):
+        self.session = session
+        self.urls = urls
+        self.interval = interval
+        self.peak = {name: 0.0 for name in urls}
+
+    async def run(self) -> None:
+        while True:
+            for name, url in self.urls.items():
+                try:
+                    samples = await scrape(self.session, url)
+                except aiohttp.ClientError:
+                    continue
+                self.peak[name] = max(self.peak[name], metric_value(samples, 'process_resident_memory_bytes'))
+            await asyncio.sleep(self.interval)
+
+
+async def worker_counters(session: aiohttp.ClientSession, urls: list) -> tuple:
+    """Messages completed and CPU seconds used, summed over all worker metrics endpoints."""
+    images = cpu = 0.0
+    for url in urls:
+        samples = await scrape(session, url)
+        images += metric_value(samples, 'worker_stage_seconds_count', stage='total')
+        cpu += metric_value(samples, 'process_cpu_seconds_total')
+    return images, cpu
+
+
+async def run_load(
+    api_url: str,
+    paths: list,
+    concurrency: int,
+    worker_metrics_urls: list,
+    analyses: str = None,
+    timeout: float = 600,
+    sample_interval: float = 1.0,
+) -> dict:
+    """Upload every path, wait for all results and return the measured metrics."""
+    async with aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=timeout)) as session:
+        listener = EventListener(session, api_url)
+        rss_urls = {f"worker_{index}": url for index, url in enumerate(worker_metrics_urls)}
+        rss_urls['api'] = f"{api_url}/metrics"
+        sampler = RssSampler(session, rss_urls, sample_interval)
+
+        listening = asyncio.create_task(listener.run())
+        await asyncio.wait_for(listener.connected.wait(), 30)
+        sampling = asyncio.create_task(sampler.run())
+        images_before, cpu_before = await worker_counters(session, worker_metrics_urls)
+
+        semaphore = asyncio.Semaphore(concurrency)
+        started_at = {}
+        upload_latencies = []
+        errors = []
+
+        async def upload(path: str) -> None:
+            async with semaphore:
+                form = aiohttp.FormData()
+                with open(path, 'rb') as f:
+                    form.add_field('file', f.read(), filename=os.path.basename(path), content_type=mimetypes.guess_type(path)[0])
+                if analyses:
+                    form.add_field('analyses', analyses)
+                start = time.perf_counter()
+                try:
+                    async with session.post(f"{api_url}/images/upload", data=form) as response:
+                        body = await response.json()
+                        if response.status != 200:
+                            raise Exception(f"{response.status}: {body}")
+                except Exception as e:
+                    errors.append(f"{os.path.basename(path)}: {e}")
+                    return
+                upload_latencies.append(time.perf_counter() - start)
+                started_at[body['image_id']] = start
+
+        load_started = time.perf_counter()
+        await asyncio.gather(*(upload(path) for path in paths))
+        uploads_finished = time.perf_counter()
+
+        # Wait for the results of every accepted upload
+        deadline = uploads_finished + timeout
+        while time.perf_counter() < deadline and not set(started_at) <= set(listener.processed_at):
+            await asyncio.sleep(0.2)
+        finished = time.perf_counter()
+
+        images_after, cpu_after = await worker_counters(session, worker_metrics_urls)
+        for task in (listening, sampling):
+            task.cancel()
+        await asyncio.gather(listening, sampling, return_exceptions=True)
+
+    e2e = [listener.processed_at[image_id] - start for image_id, start in started_at.items() if image_id in listener.processed_at]
+    if not upload_latencies or not e2e:
+        raise Exception(f"No image completed; first errors: {errors[:5]}")
+    worker_images = images_after - images_before
+    worker_cpu = cpu_after - cpu_before
+
+    return {
+        'uploads': len(paths),
+        'upload_errors': len(errors),
+        'unfinished': len(set(started_at) - set(listener.processed_at)),
+        'upload_rps': len(upload_latencies) / (uploads_finished - load_started),
+        'upload_p50_ms': 1000 * statistics.median(upload_latencies),
+        'upload_p95_ms': 1000 * percentile(upload_latencies, 0.95),
+        'upload_p99_ms': 1000 * percentile(upload_latencies, 0.99),
+        'e2e_p50_ms': 1000 * statistics.median(e2e),
+        'e2e_p95_ms': 1000 * percentile(e2e, 0.95),
+        'e2e_p99_ms': 1000 * percentile(e2e, 0.99),
+        'images_per_second': len(e2e) / (finished - load_started),
+        # Images per CPU second of the worker processes that expose metrics, i.e. per fully used core
+        'worker_images_per_core_second': worker_images / worker_cpu if worker_cpu else 0.0,
+        'worker_peak_rss_mb': max((peak for name, peak in sampler.peak.items() if name != 'api'), default=0.0) / 1e6,
+        'api_peak_rss_mb': sampler.peak['api'] / 1e6,
+        'errors': errors[:20],
+    }
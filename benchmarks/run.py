@@ -0,0 +1,132 @@
+"""
+Benchmark suite for the whole pipeline: the end-to-end load test against a
+running stack plus the worker and API micro-benchmarks, saved as one JSON
+file that benchmarks.compare can diff against an earlier run.
+
+Start the stack first (docker-compose up -d) and run from the repository root
+with the worker and API requirements installed for the micro-benchmarks:
+    python -m benchmarks.run --images 200 --concurrency 16
+    python -m benchmarks.run --skip-load --output benchmarks/results/micro.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import secrets
+import shutil
+import subprocess
+import sys
+import tempfile
+from datetime import datetime, timezone
+from benchmarks.corpus import build_corpus
+from benchmarks.loadtest import run_load
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Whether a larger value is an improvement, by metric name suffix
+HIGHER_IS_BETTER = ('_rps', '_per_second', '_per_core_second')
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+def run_micro(service: str, module: str, arguments: list) -> dict:
+    """Run a service's micro-benchmark from its own directory, which is where its imports resolve."""
+    output = subprocess.run(
+        [sys.executable, '-m', module, '--json', *arguments],
+        cwd=os.path.join(ROOT, service), capture_output=True, text=True, check=True
+    ).stdout
+    results = json.loads(output.strip().splitlines()[-1])
+    return {
+        f"{service}.{benchmark}.{stat}": value
+        for benchmark, stats in results.items()
+        for stat, value in stats.items()
+    }
+
+
+def describe(metrics: dict) -> dict:
+    return {
+        name: {'value': value, 'better': 'higher' if name.endswith(HIGHER_IS_BETTER) else 'lower'}
+        for name, value in metrics.items()
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--api-url', default='http://localhost:8000')
+    parser.add_argument('--worker-metrics', action='append', default=None,
+                        help='Prometheus endpoint of a worker, repeat for several (default http://localhost:9100/metrics)')
+    parser.add_argument('--images', type=int, default=200, help='Images uploaded by the load test')
+    parser.add_argument('--concurrency', type=int, default=16, help='Concurrent uploading clients')
+    parser.add_argument('--analyses', default=None, help='Analyses requested with each upload, all by default')
+    parser.add_argument('--seed', type=int, default=0, help='Seed of the corpus sizes and formats; keep it fixed between compared runs')
+    parser.add_argument('--nonce', type=int, default=None,
+                        help='Seed of the pixel noise, random by default so earlier uploads are never reused as duplicates')
+    parser.add_argument('--corpus-dir', default=None, help='Keep the generated corpus here instead of a temporary directory')
+    parser.add_argument('--timeout', type=float, default=600, help='Seconds to wait for all results')
+    parser.add_argument('--skip-load', action='store_true', help='Only run the micro-benchmarks')
+    parser.add_argument('--skip-micro', action='store_true', help='Only run the load test')
+    parser.add_argument('--skip-models', action='store_true', help='Leave the detectors out of the worker micro-benchmarks')
+    parser.add_argument('--output', default=None, help='Results file (default benchmarks/results/<time>_<commit>.json)')
+    args = parser.parse_args()
+
+    commit = git_commit()
+    nonce = args.nonce if args.nonce is not None else secrets.randbits(32)
+    params = {key: value for key, value in vars(args).items() if key not in ('output', 'nonce', 'corpus_dir')}
+    metrics = {}
+    errors = []
+
+    if not args.skip_load:
+        corpus_dir = args.corpus_dir or tempfile.mkdtemp(prefix='insightx_corpus_')
+        try:
+            paths = build_corpus(corpus_dir, args.images, args.seed, nonce)
+            print(f"Uploading {len(paths)} images with {args.concurrency} clients...")
+            load = asyncio.run(run_load(
+                args.api_url,
+                paths,
+                args.concurrency,
+                args.worker_metrics or ['http://localhost:9100/metrics'],
+                args.analyses,
+                args.timeout,
+            ))
+        finally:
+            if args.corpus_dir is None:
+                shutil.rmtree(corpus_dir, ignore_errors=True)
+        errors = load.pop('errors')
+        metrics.update({f"load.{name}": value for name, value in load.items()})
+
+    if not args.skip_micro:
+        print("Running micro-benchmarks...")
+        metrics.update(run_micro('worker', 'benchmarks.micro', ['--skip-models'] if args.skip_models else []))
+        metrics.update(run_micro('api', 'benchmarks.format_rows', []))
+
+    created_at = datetime.now(timezone.utc)
+    output = args.output or os.path.join(
+        ROOT, 'benchmarks', 'results', f"{created_at.strftime('%Y%m%dT%H%M%S')}_{commit}.json"
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump({
+            'created_at': created_at.isoformat(),
+            'commit': commit,
+            'nonce': nonce,
+            'machine': {'platform': platform.platform(), 'python': platform.python_version(), 'cpus': os.cpu_count()},
+            'params': params,
+            'metrics': describe(metrics),
+            'errors': errors,
+        }, f, indent=2)
+
+    for name, value in metrics.items():
+        print(f"{name:<48}{value:>14.2f}")
+    print(f"Results written to {output}")
+
+
+if __name__ == "__main__":
+    main()
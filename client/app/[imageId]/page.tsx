@@ -3,7 +3,7 @@
 import { useState, useEffect } from "react"
 import { useRouter } from "next/navigation"
 import Image from "next/image"
-import { fetchImageById } from "@/lib/api"
+import { fetchImageById, subscribeToImageEvents } from "@/lib/api"
 import type { ImageResult } from "@/lib/types"
 import { Button } from "@/components/ui/button"
 import { Card, CardContent, CardHeader, CardTitle } from "@/components/ui/card"
@@ -13,6 +13,7 @@ import { ArrowLeft, Loader2, RefreshCw } from "lucide-react"
 import { useToast } from "@/hooks/use-toast"
 import { formatDate, getObjectBadges } from "@/lib/utils"
 import { ObjectBadge } from "@/components/object-badge"
+import { BoxOverlay } from "@/components/box-overlay"
 import { ProcessingStatusBadge } from "@/components/processing-status-badge"
 
 export default function ImageDetailsPage({ params }: { params: { imageId: string } }) {
@@ -61,6 +62,17 @@ export default function ImageDetailsPage({ params }: { params: { imageId: string
     }
   }, [imageId, toast])
 
+  // Reload once the worker reports results instead of polling
+  const isProcessed = image?.is_processed
+  useEffect(() => {
+    if (!imageId || isProcessed !== false) {
+      return
+    }
+    return subscribeToImageEvents([imageId], async () => {
+      setImage(await fetchImageById(imageId))
+    })
+  }, [imageId, isProcessed])
+
   if (loading) {
     return (
         <main className="flex-1 container mx-auto px-4 py-8 flex items-center justify-center">
@@ -127,7 +139,7 @@ export default function ImageDetailsPage({ params }: { params: { imageId: string
                     <TabsTrigger value="original">Original Image</TabsTrigger>
                   </TabsList>
                   <TabsContent value="processed" className="mt-4">
-                    {image.is_processed ? (
+                    {image.is_processed && image.output_image_url ? (
                       <div className="relative aspect-video bg-gray-100 rounded-md overflow-hidden">
                         <Image
                           src={image.output_image_url}
@@ -136,6 +148,12 @@ export default function ImageDetailsPage({ params }: { params: { imageId: string
                           className="object-contain"
                         />
                       </div>
+                    ) : image.is_processed && image.overlay && image.analyses.includes("annotate") ? (
+                      <BoxOverlay src={image.derivatives.medium || image.input_image_url} alt={image.name} overlay={image.overlay} />
+                    ) : image.is_processed ? (
+                      <div className="flex items-center justify-center h-64 bg-gray-100 rounded-md">
+                        <p>No annotated image was requested</p>
+                      </div>
                     ) : (
                       <div className="flex items-center justify-center h-64 bg-gray-100 rounded-md">
                         <div className="flex flex-col items-center">
@@ -192,7 +210,7 @@ export default function ImageDetailsPage({ params }: { params: { imageId: string
                 <CardTitle className="text-xl">Detected Objects</CardTitle>
               </CardHeader>
               <CardContent>
-                {image.detected_objects.length > 0 ? (
+                {image.detected_objects && image.detected_objects.length > 0 ? (
                   <div className="flex flex-wrap gap-2">
                     {getObjectBadges(image.detected_objects).map(({ title, count }) => (
                       <ObjectBadge
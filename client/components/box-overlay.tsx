@@ -0,0 +1,46 @@
+import Image from "next/image"
+import { Overlay } from "@/lib/types"
+
+interface BoxOverlayProps {
+  src: string
+  alt: string
+  overlay: Overlay
+}
+
+// Container of the overlay, see the aspect-video class below
+const CONTAINER_RATIO = 16 / 9
+
+// Draws the detected boxes over the original image instead of loading an annotated copy
+export function BoxOverlay({ src, alt, overlay }: BoxOverlayProps) {
+  const ratio = overlay.width / overlay.height
+  const wide = ratio >= CONTAINER_RATIO
+
+  const boxStyle = (box: number[]) => ({
+    left: `${box[0] * 100}%`,
+    top: `${box[1] * 100}%`,
+    width: `${(box[2] - box[0]) * 100}%`,
+    height: `${(box[3] - box[1]) * 100}%`,
+  })
+
+  return (
+    <div className="flex items-center justify-center aspect-video bg-gray-100 rounded-md overflow-hidden">
+      {/* Sized like the contained image so relative boxes line up with it */}
+      <div
+        className="relative"
+        style={{ aspectRatio: `${overlay.width} / ${overlay.height}`, width: wide ? "100%" : "auto", height: wide ? "auto" : "100%" }}
+      >
+        <Image src={src} alt={alt} fill className="object-contain" />
+        {overlay.objects.map((detection, index) => (
+          <div key={`object-${index}`} className="absolute border-2 border-green-600" style={boxStyle(detection.box)}>
+            <span className="absolute -top-5 left-0 bg-green-600 px-1 text-xs text-white whitespace-nowrap">
+              {detection.class} {detection.confidence.toFixed(2)}
+            </span>
+          </div>
+        ))}
+        {overlay.nsfw.map((detection, index) => (
+          <div key={`nsfw-${index}`} className="absolute border-2 border-red-600" style={boxStyle(detection.box)} />
+        ))}
+      </div>
+    </div>
+  )
+}
@@ -100,7 +100,7 @@ export function ImageResults({ images, onImageUpdate, onSort, sortConfig, viewMo
                 <TableCell>
                   <div className="relative h-10 w-10 rounded-md overflow-hidden bg-gray-100">
                     <Image
-                      src={image.input_image_url || "/placeholder.png"}
+                      src={image.derivatives.thumbnail || image.input_image_url || "/placeholder.png"}
                       alt={image.name}
                       fill
                       className="object-cover"
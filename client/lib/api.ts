@@ -1,5 +1,5 @@
 import axios from "axios"
-import type { ImageResult, PaginatedResponse } from "./types"
+import type { ImageResult, PaginatedResponse, PresignedUpload } from "./types"
 import config from "@/common/config"
 
 
@@ -34,23 +34,45 @@ export async function fetchImageById(imageId: number): Promise<ImageResult> {
   }
 }
 
-// Upload an image
+// Follow result events of the given images; returns a function that closes the stream
+export function subscribeToImageEvents(imageIds: number[], onProcessed: (imageId: number) => void): () => void {
+  const params = new URLSearchParams({ image_ids: imageIds.join(",") })
+  const source = new EventSource(`${config?.apiUrl}/images/events?${params.toString()}`)
+  source.addEventListener("image.processed", (event) => {
+    const data = JSON.parse((event as MessageEvent).data)
+    onProcessed(data.image_id)
+  })
+  return () => source.close()
+}
+
+// Upload an image straight to storage, then register it with the API
 export async function uploadImage(file: File, onProgress?: (progressEvent: any) => void): Promise<ImageResult> {
   try {
+    const { data: target } = await axios.post<PresignedUpload>(`${config?.apiUrl}/images/upload_url`, {
+      filename: file.name,
+      content_type: file.type || "application/octet-stream",
+    })
+
+    // The presigned fields must come before the file in the form
     const formData = new FormData()
+    Object.entries(target.fields).forEach(([key, value]) => formData.append(key, value))
     formData.append("file", file)
 
-    const response = await axios.post(`${config?.apiUrl}/images/upload`, formData, {
+    await axios.post(target.url, formData, {
       headers: {
         "Content-Type": "multipart/form-data",
       },
       onUploadProgress: onProgress,
     })
 
+    const response = await axios.post(`${config?.apiUrl}/images/upload/finalize`, {
+      storage_path: target.storage_path,
+      name: file.name,
+    })
+
     return response.data
   } catch (error) {
     console.error("Error uploading image:", error)
     throw error
   }
 }
-
@@ -4,17 +4,32 @@ export interface DetectedObject {
   box: number[] // [x1, y1, x2, y2] coordinates
 }
 
+// Boxes are [x1, y1, x2, y2] relative to the original image size
+export interface Overlay {
+  width: number
+  height: number
+  objects: DetectedObject[]
+  nsfw: Array<{ class: string; score: number; box: number[] }>
+}
+
 export interface ImageResult {
   image_id: number
   name: string
   is_processed: boolean
-  is_nsfw: boolean
+  // null when the analysis was not requested
+  is_nsfw: boolean | null
   input_image_url: string
-  detected_nsfw: any[]
-  detected_objects: DetectedObject[]
+  detected_nsfw: any[] | null
+  detected_objects: DetectedObject[] | null
+  analyses: string[]
+  width: number | null
+  height: number | null
+  overlay: Overlay | null
   created_at: string
   updated_at: string
-  output_image_url: string
+  output_image_url: string | null
+  // Small WebP copies (thumbnail, medium) by name
+  derivatives: Record<string, string>
 }
 
 export interface PaginatedResponse {
@@ -23,3 +38,10 @@ export interface PaginatedResponse {
   total: number
   data: ImageResult[]
 }
+
+export interface PresignedUpload {
+  storage_path: string
+  url: string
+  fields: Record<string, string>
+  expires_in: number
+}
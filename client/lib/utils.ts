@@ -21,9 +21,9 @@ export function truncateText(text: string, maxLength: number): string {
   return text.slice(0, maxLength) + "..."
 }
 
-export function getObjectBadges(detectedObjects: Array<{ class: string; confidence: number }>) {
+export function getObjectBadges(detectedObjects: Array<{ class: string; confidence: number }> | null) {
   return Object.entries(
-    detectedObjects.reduce((acc, obj) => {
+    (detectedObjects ?? []).reduce((acc, obj) => {
       acc[obj.class] = (acc[obj.class] || 0) + 1;
       return acc;
     }, {} as Record<string, number>)
@@ -0,0 +1,60 @@
+"""
+Throughput comparison between the one-by-one detection path and micro-batched
+detection.
+
+Run from the worker directory:
+    python -m benchmarks.batching --images 64 --batch-sizes 1,4,8,16
+    python -m benchmarks.batching --image-dir ./samples
+"""
+import argparse
+import time
+from benchmarks.corpus import load_tensors
+from processors.detection import (
+    run_nsfw_detection,
+    run_yolo_detection,
+    run_nsfw_detection_batch,
+    run_yolo_detection_batch,
+)
+
+
+def bench_sequential(images: list) -> float:
+    start = time.perf_counter()
+    for image in images:
+        run_nsfw_detection(image)
+        run_yolo_detection(image)
+    return time.perf_counter() - start
+
+
+def bench_batched(images: list, batch_size: int) -> float:
+    start = time.perf_counter()
+    for i in range(0, len(images), batch_size):
+        batch = images[i:i + batch_size]
+        run_nsfw_detection_batch(batch)
+        run_yolo_detection_batch(batch)
+    return time.perf_counter() - start
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--images', type=int, default=64, help='Number of images to process per run')
+    parser.add_argument('--size', type=int, default=640, help='Side of the prepared model input in pixels')
+    parser.add_argument('--image-dir', default=None, help='Use the images in this directory instead of synthetic ones')
+    parser.add_argument('--batch-sizes', default='1,4,8,16', help='Comma separated batch sizes to compare')
+    args = parser.parse_args()
+
+    images = load_tensors(args.images, args.size, args.image_dir)
+    batch_sizes = [int(value) for value in args.batch_sizes.split(',')]
+
+    # Warm up both models so lazy initialisation is not counted
+    bench_batched(images[:max(batch_sizes)], max(batch_sizes))
+
+    baseline = bench_sequential(images)
+    print(f"{'mode':<12}{'batch':>6}{'seconds':>10}{'img/s':>10}{'speedup':>9}")
+    print(f"{'sequential':<12}{1:>6}{baseline:>10.2f}{len(images) / baseline:>10.2f}{1.0:>8.2f}x")
+    for batch_size in batch_sizes:
+        elapsed = bench_batched(images, batch_size)
+        print(f"{'batched':<12}{batch_size:>6}{elapsed:>10.2f}{len(images) / elapsed:>10.2f}{baseline / elapsed:>8.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,43 @@
+import os
+import numpy as np
+from io import BytesIO
+from PIL import Image
+
+
+def make_image(width: int, height: int, pil_format: str = 'JPEG', seed=0) -> bytes:
+    """
+    Synthetic photo of the given size and format. Also used by the pipeline
+    benchmarks at the repository root, so nothing worker-specific is imported here.
+    """
+    # Smooth gradients plus noise compress like a photo rather than like pure noise
+    rng = np.random.default_rng(seed)
+    x = np.linspace(0, 255, width, dtype=np.float32)
+    y = np.linspace(0, 255, height, dtype=np.float32)[:, None]
+    base = np.stack([x + 0 * y, y + 0 * x, (x + y) / 2], axis=-1)
+    pixels = np.clip(base + rng.normal(0, 12, base.shape), 0, 255).astype(np.uint8)
+    buffer = BytesIO()
+    options = {'quality': 90} if pil_format in ('JPEG', 'WEBP') else {}
+    Image.fromarray(pixels).save(buffer, format=pil_format, **options)
+    return buffer.getvalue()
+
+
+def load_tensors(count: int, size: int, image_dir: str = None) -> list:
+    """
+    Prepared model input buffers, as the worker passes them to the detectors:
+    from the images in `image_dir` if given, otherwise synthetic noise.
+    """
+    from processors.preprocess import prepare_image
+
+    if image_dir:
+        paths = sorted(
+            os.path.join(image_dir, name) for name in os.listdir(image_dir)
+            if name.lower().endswith(('.jpg', '.jpeg', '.png', '.webp'))
+        )
+        tensors = []
+        for path in paths:
+            with open(path, 'rb') as f:
+                tensors.append(prepare_image(f.read(), size).tensor)
+        return (tensors * (count // len(tensors) + 1))[:count]
+
+    rng = np.random.default_rng(0)
+    return [rng.integers(0, 255, (size, size, 3), dtype=np.uint8) for _ in range(count)]
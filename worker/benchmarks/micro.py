@@ -0,0 +1,97 @@
+"""
+Micro-benchmarks of the worker's CPU stages on a synthetic photo: reduced
+decode with derivatives, both detectors per batch, drawing the boxes and
+encoding the annotated copy in each output format.
+
+Run from the worker directory:
+    python -m benchmarks.micro --runs 20
+    python -m benchmarks.micro --skip-models --json > micro.json
+"""
+import argparse
+import json
+import statistics
+import time
+from io import BytesIO
+from PIL import Image
+from benchmarks.corpus import make_image
+from processors.preprocess import prepare_image, parse_derivative_sizes
+from processors.image_processor import draw_detections, encode_image, IMAGE_FORMATS
+
+
+def measure(fn, runs: int, warmup: int = 2) -> dict:
+    for _ in range(warmup):
+        fn()
+    latencies = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        fn()
+        latencies.append(time.perf_counter() - start)
+    latencies.sort()
+    return {
+        'mean_ms': 1000 * statistics.fmean(latencies),
+        'p50_ms': 1000 * statistics.median(latencies),
+        'p95_ms': 1000 * latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))],
+    }
+
+
+def synthetic_detections(width: int, height: int, count: int) -> tuple:
+    # Evenly spread boxes in original coordinates, like a crowded street scene
+    objects = []
+    for index in range(count):
+        x = (index * 97) % max(1, width - 200)
+        y = (index * 61) % max(1, height - 200)
+        objects.append({'box': [x, y, x + 180, y + 180], 'class': 'person', 'confidence': 0.87})
+    nsfw = [{'box': [width // 4, height // 4, width // 8, height // 8], 'class': 'FACE_FEMALE', 'score': 0.6}]
+    return objects, nsfw
+
+
+def run(args) -> dict:
+    image_data = make_image(args.width, args.height)
+    image = Image.open(BytesIO(image_data))
+    image.load()
+    objects, nsfw = synthetic_detections(args.width, args.height, args.detections)
+    derivative_sizes = parse_derivative_sizes(args.derivatives)
+
+    results = {
+        'prepare_image': measure(lambda: prepare_image(image_data, args.input_size, derivative_sizes), args.runs),
+        'draw_detections': measure(lambda: draw_detections(image, objects, nsfw), args.runs),
+    }
+    for name in ('jpg', 'png', 'webp'):
+        results[f'encode_{name}'] = measure(lambda: encode_image(image, IMAGE_FORMATS[name], BytesIO()), args.runs)
+
+    if not args.skip_models:
+        from benchmarks.corpus import load_tensors
+        from processors.detection import load_models, run_nsfw_detection_batch, run_yolo_detection_batch
+        load_models()
+        batch = load_tensors(args.batch_size, args.input_size)
+        for name, detect in (('nsfw_batch', run_nsfw_detection_batch), ('yolo_batch', run_yolo_detection_batch)):
+            results[name] = measure(lambda: detect(batch), args.runs)
+            results[name]['per_image_ms'] = results[name]['mean_ms'] / args.batch_size
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--width', type=int, default=4032)
+    parser.add_argument('--height', type=int, default=3024)
+    parser.add_argument('--runs', type=int, default=20)
+    parser.add_argument('--input-size', type=int, default=640)
+    parser.add_argument('--derivatives', default='thumbnail:256,medium:1024')
+    parser.add_argument('--detections', type=int, default=25, help='Boxes drawn per image')
+    parser.add_argument('--batch-size', type=int, default=8, help='Images per detector call')
+    parser.add_argument('--skip-models', action='store_true', help='Leave out the detectors, which need the model files')
+    parser.add_argument('--json', action='store_true', help='Print the results as JSON instead of a table')
+    args = parser.parse_args()
+
+    results = run(args)
+    if args.json:
+        print(json.dumps(results))
+        return
+    print(f"{args.width}x{args.height} JPEG, {args.detections} boxes, detector batches of {args.batch_size}")
+    print(f"{'benchmark':<18}{'mean ms':>10}{'p50 ms':>10}{'p95 ms':>10}")
+    for name, result in results.items():
+        print(f"{name:<18}{result['mean_ms']:>10.2f}{result['p50_ms']:>10.2f}{result['p95_ms']:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
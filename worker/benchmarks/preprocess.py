@@ -0,0 +1,78 @@
+"""
+Peak RSS and latency of the detection path for large images: full resolution
+decode with a separate NumPy copy for NudeNet (previous path) against the
+reduced decode into one letterboxed buffer shared by both detectors.
+
+Each path runs in its own process so peak RSS is measured independently.
+Run from the worker directory:
+    python -m benchmarks.preprocess --width 5472 --height 3648 --runs 5
+"""
+import argparse
+import multiprocessing
+import resource
+import time
+import numpy as np
+from io import BytesIO
+from PIL import Image
+from benchmarks.corpus import make_image
+
+
+def peak_rss_mb() -> float:
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def run_path(path: str, image_data: bytes, runs: int, input_size: int) -> dict:
+    from processors.detection import load_models, run_nsfw_detection_batch, run_yolo_detection_batch
+    from processors.preprocess import prepare_image, rescale_detections
+
+    load_models()
+    # Warm up on a small image so lazy model initialisation is not measured
+    warmup = np.zeros((input_size, input_size, 3), dtype=np.uint8)
+    run_nsfw_detection_batch([warmup])
+    run_yolo_detection_batch([warmup])
+    baseline = peak_rss_mb()
+
+    latencies = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        if path == 'full':
+            image = Image.open(BytesIO(image_data))
+            image.load()
+            run_nsfw_detection_batch([image])
+            run_yolo_detection_batch([image])
+        else:
+            prepared = prepare_image(image_data, input_size)
+            nsfw = run_nsfw_detection_batch([prepared.tensor])[0]
+            objects = run_yolo_detection_batch([prepared.tensor])[0]
+            rescale_detections(objects, nsfw, prepared)
+        latencies.append(time.perf_counter() - start)
+
+    return {
+        'path': path,
+        'mean_ms': 1000 * sum(latencies) / len(latencies),
+        'peak_rss_mb': peak_rss_mb(),
+        'rss_over_models_mb': peak_rss_mb() - baseline,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--width', type=int, default=5472)
+    parser.add_argument('--height', type=int, default=3648)
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--input-size', type=int, default=640)
+    args = parser.parse_args()
+
+    image_data = make_image(args.width, args.height)
+    print(f"{args.width}x{args.height} JPEG, {len(image_data) / 1e6:.1f} MB")
+    print(f"{'path':<10}{'mean ms':>10}{'peak RSS MB':>14}{'over models MB':>16}")
+
+    context = multiprocessing.get_context('spawn')
+    for path in ('full', 'reduced'):
+        with context.Pool(1) as pool:
+            result = pool.apply(run_path, (path, image_data, args.runs, args.input_size))
+        print(f"{result['path']:<10}{result['mean_ms']:>10.1f}{result['peak_rss_mb']:>14.1f}{result['rss_over_models_mb']:>16.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""
+Parity and speed of exported YOLO backends against the PyTorch model.
+
+Every backend runs on the same prepared buffers. A detection matches when a
+PyTorch detection of the same class overlaps it with IoU >= --min-iou and
+their confidences differ by at most --max-confidence-diff. Exits with status
+1 if the share of matched detections is below --min-parity.
+
+Run from the worker directory:
+    python -m benchmarks.yolo_backends --onnx models/yolov8n.onnx
+    python -m benchmarks.yolo_backends --onnx models/yolov8n.onnx --openvino models/yolov8n_openvino_model/ --image-dir ./samples
+"""
+import argparse
+import sys
+import time
+from benchmarks.corpus import load_tensors
+from processors.yolo_backends import create_yolo_detector
+
+
+def iou(a: list, b: list) -> float:
+    width = max(0.0, min(a[2], b[2]) - max(a[0], b[0]))
+    height = max(0.0, min(a[3], b[3]) - max(a[1], b[1]))
+    intersection = width * height
+    union = (a[2] - a[0]) * (a[3] - a[1]) + (b[2] - b[0]) * (b[3] - b[1]) - intersection
+    return intersection / union if union > 0 else 0.0
+
+
+def parity(reference: list, candidate: list, min_iou: float, max_confidence_diff: float) -> tuple:
+    """Return (matched, total) over both directions so missing and extra detections both count."""
+    matched = 0
+    unused = list(candidate)
+    for expected in reference:
+        for detection in unused:
+            if (
+                detection['class'] == expected['class']
+                and iou(detection['box'], expected['box']) >= min_iou
+                and abs(detection['confidence'] - expected['confidence']) <= max_confidence_diff
+            ):
+                matched += 1
+                unused.remove(detection)
+                break
+    return matched, max(len(reference), len(candidate))
+
+
+def parity_share(reference: list, results: list, min_iou: float, max_confidence_diff: float) -> float:
+    """Share of matched detections over all images, 1.0 when neither side detects anything."""
+    matched, total = 0, 0
+    for expected, candidate in zip(reference, results):
+        image_matched, image_total = parity(expected, candidate, min_iou, max_confidence_diff)
+        matched += image_matched
+        total += image_total
+    return matched / total if total else 1.0
+
+
+def timed_run(detector, images: list, batch_size: int) -> tuple:
+    results = []
+    start = time.perf_counter()
+    for i in range(0, len(images), batch_size):
+        results.extend(detector.detect_batch(images[i:i + batch_size]))
+    return results, time.perf_counter() - start
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--pytorch', default='models/yolov8n.pt', help='Reference PyTorch checkpoint')
+    parser.add_argument('--onnx', default=None, help='Exported ONNX model')
+    parser.add_argument('--openvino', default=None, help='Exported OpenVINO model directory')
+    parser.add_argument('--images', type=int, default=32)
+    parser.add_argument('--size', type=int, default=640)
+    parser.add_argument('--image-dir', default=None, help='Use the images in this directory instead of synthetic ones')
+    parser.add_argument('--batch-size', type=int, default=8)
+    parser.add_argument('--min-iou', type=float, default=0.9)
+    parser.add_argument('--max-confidence-diff', type=float, default=0.05)
+    parser.add_argument('--min-parity', type=float, default=0.95)
+    args = parser.parse_args()
+
+    images = load_tensors(args.images, args.size, args.image_dir)
+    backends = [('ultralytics', args.pytorch)]
+    if args.onnx:
+        backends.append(('onnx', args.onnx))
+    if args.openvino:
+        backends.append(('openvino', args.openvino))
+
+    reference = None
+    baseline = None
+    failed = False
+    print(f"{'backend':<14}{'img/s':>10}{'speedup':>9}{'parity':>9}")
+    for backend, model_path in backends:
+        detector = create_yolo_detector(backend, model_path)
+        detector.detect_batch(images[:args.batch_size])
+        results, elapsed = timed_run(detector, images, args.batch_size)
+
+        if reference is None:
+            reference, baseline = results, elapsed
+            share = 1.0
+        else:
+            share = parity_share(reference, results, args.min_iou, args.max_confidence_diff)
+            failed = failed or share < args.min_parity
+        print(f"{backend:<14}{len(images) / elapsed:>10.2f}{baseline / elapsed:>8.2f}x{share:>9.1%}")
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
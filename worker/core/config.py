@@ -16,4 +16,91 @@ class Config(object):
     RABBITMQ_USER = os.getenv('RABBITMQ_USER')
     RABBITMQ_PASSWORD = os.getenv('RABBITMQ_PASSWORD')
     RABBITMQ_VHOST = os.getenv('RABBITMQ_VHOST')
-    RABBITMQ_IMAGE_PROCESSING_QUEUE = os.getenv('RABBITMQ_IMAGE_PROCESSING_QUEUE')
\ No newline at end of file
+    RABBITMQ_IMAGE_PROCESSING_QUEUE = os.getenv('RABBITMQ_IMAGE_PROCESSING_QUEUE')
+    RABBITMQ_BULK_QUEUE = os.getenv('RABBITMQ_BULK_QUEUE', f"{RABBITMQ_IMAGE_PROCESSING_QUEUE}_bulk")
+
+    # Micro-batching of detector calls
+    WORKER_BATCH_SIZE = int(os.getenv('WORKER_BATCH_SIZE', 8))
+    WORKER_BATCH_TIMEOUT_MS = int(os.getenv('WORKER_BATCH_TIMEOUT_MS', 50))
+
+    # Execution of blocking stages (inference, drawing, encoding, S3 calls)
+    WORKER_EXECUTOR = os.getenv('WORKER_EXECUTOR', 'thread')
+    WORKER_EXECUTOR_WORKERS = int(os.getenv('WORKER_EXECUTOR_WORKERS', 2))
+    WORKER_IO_THREADS = int(os.getenv('WORKER_IO_THREADS', 8))
+    WORKER_MAX_IN_FLIGHT = int(os.getenv('WORKER_MAX_IN_FLIGHT', 16))
+
+
+    # Consumption and backpressure. Each stage holds at most this many messages;
+    # when inference is saturated, unacked messages fill the prefetch window
+    # and RabbitMQ stops delivering.
+    WORKER_PREFETCH_COUNT = int(os.getenv('WORKER_PREFETCH_COUNT', WORKER_MAX_IN_FLIGHT))
+    # Tiers consumed by this worker as tier:prefetch pairs (interactive, bulk); tiers
+    # without a count share what the others leave of WORKER_MAX_IN_FLIGHT, up to
+    # WORKER_PREFETCH_COUNT. Each tier has its own channel and window; the windows
+    # together may not exceed WORKER_MAX_IN_FLIGHT.
+    WORKER_QUEUE_TIERS = os.getenv('WORKER_QUEUE_TIERS', 'interactive,bulk:4')
+    WORKER_DOWNLOAD_CONCURRENCY = int(os.getenv('WORKER_DOWNLOAD_CONCURRENCY', 4))
+    WORKER_INFERENCE_CONCURRENCY = int(os.getenv('WORKER_INFERENCE_CONCURRENCY', 2 * WORKER_BATCH_SIZE))
+    WORKER_UPLOAD_CONCURRENCY = int(os.getenv('WORKER_UPLOAD_CONCURRENCY', 4))
+    WORKER_CALLBACK_CONCURRENCY = int(os.getenv('WORKER_CALLBACK_CONCURRENCY', 32))
+
+    # Supervisor mode: number of inference processes, each with its own models (0 = in-process)
+    WORKER_INFERENCE_PROCESSES = int(os.getenv('WORKER_INFERENCE_PROCESSES', 0))
+    WORKER_POOL_MONITOR_INTERVAL = float(os.getenv('WORKER_POOL_MONITOR_INTERVAL', 1.0))
+
+    # Number of recent content hashes whose detection results are reused for duplicates
+    WORKER_RESULT_CACHE_SIZE = int(os.getenv('WORKER_RESULT_CACHE_SIZE', 1024))
+
+    # Buffered result reporting to the API
+    WORKER_RESULT_BATCH_SIZE = int(os.getenv('WORKER_RESULT_BATCH_SIZE', 16))
+    WORKER_RESULT_FLUSH_MS = int(os.getenv('WORKER_RESULT_FLUSH_MS', 200))
+
+    # Shared HTTP session used for the API and presigned storage requests
+    WORKER_HTTP_CONNECTION_LIMIT = int(os.getenv('WORKER_HTTP_CONNECTION_LIMIT', 100))
+    WORKER_HTTP_CONNECTION_LIMIT_PER_HOST = int(os.getenv('WORKER_HTTP_CONNECTION_LIMIT_PER_HOST', 32))
+    WORKER_HTTP_DNS_CACHE_TTL = int(os.getenv('WORKER_HTTP_DNS_CACHE_TTL', 300))
+    WORKER_HTTP_KEEPALIVE_TIMEOUT = float(os.getenv('WORKER_HTTP_KEEPALIVE_TIMEOUT', 60))
+    WORKER_HTTP_TIMEOUT = float(os.getenv('WORKER_HTTP_TIMEOUT', 120))
+
+    # Processed images are written straight to storage ('direct') or through a presigned url from the API ('api')
+    WORKER_PROCESSED_UPLOAD_MODE = os.getenv('WORKER_PROCESSED_UPLOAD_MODE', 'direct')
+    S3_MAX_POOL_CONNECTIONS = int(os.getenv('S3_MAX_POOL_CONNECTIONS', 50))
+    S3_MULTIPART_THRESHOLD = int(os.getenv('S3_MULTIPART_THRESHOLD', 8 * 1024 * 1024))
+    S3_MULTIPART_PART_SIZE = int(os.getenv('S3_MULTIPART_PART_SIZE', 8 * 1024 * 1024))
+    S3_MULTIPART_CONCURRENCY = int(os.getenv('S3_MULTIPART_CONCURRENCY', 4))
+
+    # Side of the square letterboxed buffer both detectors run on
+    WORKER_MODEL_INPUT_SIZE = int(os.getenv('WORKER_MODEL_INPUT_SIZE', 640))
+
+    # WebP derivatives stored next to the processed image, as name:longest side pairs (empty disables them)
+    WORKER_DERIVATIVES = os.getenv('WORKER_DERIVATIVES', 'thumbnail:256,medium:1024')
+    WORKER_DERIVATIVE_QUALITY = int(os.getenv('WORKER_DERIVATIVE_QUALITY', 75))
+
+    # 'raster' uploads an annotated copy of every image, 'vector' leaves drawing the boxes to clients
+    WORKER_OUTPUT_MODE = os.getenv('WORKER_OUTPUT_MODE', 'raster')
+    # Annotated copy: longest side (0 keeps the original size), format ('original' or jpg/png/webp) and encoder settings
+    WORKER_ANNOTATION_MAX_SIZE = int(os.getenv('WORKER_ANNOTATION_MAX_SIZE', 0))
+    WORKER_OUTPUT_FORMAT = os.getenv('WORKER_OUTPUT_FORMAT', 'original')
+    WORKER_OUTPUT_QUALITY = int(os.getenv('WORKER_OUTPUT_QUALITY', 75))
+    WORKER_PNG_COMPRESS_LEVEL = int(os.getenv('WORKER_PNG_COMPRESS_LEVEL', 1))
+    WORKER_OUTPUT_SPOOL_SIZE = int(os.getenv('WORKER_OUTPUT_SPOOL_SIZE', 8 * 1024 * 1024))
+
+    # YOLO inference backend: 'ultralytics' (PyTorch .pt), 'onnx' (ONNX Runtime) or 'openvino' (exported model dir)
+    WORKER_YOLO_BACKEND = os.getenv('WORKER_YOLO_BACKEND', 'ultralytics')
+    WORKER_YOLO_MODEL_PATH = os.getenv('WORKER_YOLO_MODEL_PATH', 'yolov8n.pt')
+    WORKER_YOLO_CONFIDENCE = float(os.getenv('WORKER_YOLO_CONFIDENCE', 0.25))
+    WORKER_YOLO_IOU = float(os.getenv('WORKER_YOLO_IOU', 0.7))
+    WORKER_YOLO_MAX_DETECTIONS = int(os.getenv('WORKER_YOLO_MAX_DETECTIONS', 300))
+    WORKER_ONNX_INTRA_OP_THREADS = int(os.getenv('WORKER_ONNX_INTRA_OP_THREADS', 0))
+    WORKER_ONNX_INTER_OP_THREADS = int(os.getenv('WORKER_ONNX_INTER_OP_THREADS', 0))
+    WORKER_ONNX_GRAPH_OPTIMIZATION = os.getenv('WORKER_ONNX_GRAPH_OPTIMIZATION', 'all')
+
+    # Models are read from this directory only and never downloaded at runtime.
+    # Relative model paths (such as WORKER_YOLO_MODEL_PATH) are resolved against it.
+    WORKER_MODEL_CACHE_DIR = os.getenv('WORKER_MODEL_CACHE_DIR', 'models')
+    # Blank images run through both models before the worker starts consuming
+    WORKER_WARMUP_BATCH_SIZE = int(os.getenv('WORKER_WARMUP_BATCH_SIZE', WORKER_BATCH_SIZE))
+
+    LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO')
+    # Port of the Prometheus /metrics endpoint (0 disables it)
+    WORKER_METRICS_PORT = int(os.getenv('WORKER_METRICS_PORT', 9100))
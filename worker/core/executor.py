@@ -0,0 +1,93 @@
+import asyncio
+import functools
+import logging
+import multiprocessing
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from core.config import Config
+
+logger = logging.getLogger(__name__)
+
+EXECUTOR_MODES = ('thread', 'process', 'inline')
+
+
+def init_process(initializer, ready) -> None:
+    # Runs once in each pool process before it accepts any task
+    if initializer is not None:
+        initializer()
+    ready.release()
+
+
+def noop() -> None:
+    pass
+
+
+class BlockingExecutor:
+    """
+    Runs blocking work off the event loop so heartbeats, acks and network I/O
+    keep flowing while an image is processed.
+
+    - `run_io` is for blocking network calls (boto3) and always uses threads.
+    - `run_cpu` is for inference, drawing and encoding and follows
+      WORKER_EXECUTOR: a thread pool, a process pool, or inline on the loop.
+    """
+
+    def __init__(self):
+        self.mode = Config.WORKER_EXECUTOR
+        if self.mode not in EXECUTOR_MODES:
+            raise ValueError(f"Invalid WORKER_EXECUTOR '{self.mode}'. Allowed: {', '.join(EXECUTOR_MODES)}")
+        self._io_executor = None
+        self._cpu_executor = None
+        self._ready = None
+
+    def start(self, process_initializer=None) -> None:
+        """`process_initializer` runs once in every process of the pool in process mode."""
+        self._io_executor = ThreadPoolExecutor(
+            max_workers=Config.WORKER_IO_THREADS,
+            thread_name_prefix='worker-io'
+        )
+        if self.mode == 'thread':
+            self._cpu_executor = ThreadPoolExecutor(
+                max_workers=Config.WORKER_EXECUTOR_WORKERS,
+                thread_name_prefix='worker-cpu'
+            )
+        elif self.mode == 'process':
+            # Spawned children import the processors and load their own model copies
+            context = multiprocessing.get_context('spawn')
+            self._ready = context.Semaphore(0)
+            self._cpu_executor = ProcessPoolExecutor(
+                max_workers=Config.WORKER_EXECUTOR_WORKERS,
+                mp_context=context,
+                initializer=init_process,
+                initargs=(process_initializer, self._ready)
+            )
+        logger.info(f"Blocking executor started in '{self.mode}' mode with {Config.WORKER_EXECUTOR_WORKERS} CPU workers")
+
+    async def wait_processes_ready(self) -> None:
+        """Start every process of the pool and wait until each has run its initializer."""
+        if self._ready is None:
+            return
+        # A submission made while no process is idle starts a new one, so these start the whole
+        # pool; they fail with BrokenProcessPool if an initializer raised
+        await asyncio.gather(*[self.run_cpu(noop) for _ in range(Config.WORKER_EXECUTOR_WORKERS)])
+        for _ in range(Config.WORKER_EXECUTOR_WORKERS):
+            await asyncio.to_thread(self._ready.acquire)
+
+    def shutdown(self) -> None:
+        for executor in (self._cpu_executor, self._io_executor):
+            if executor is not None:
+                executor.shutdown(wait=True, cancel_futures=True)
+        self._cpu_executor = None
+        self._io_executor = None
+
+    async def run_io(self, func, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._io_executor, functools.partial(func, *args, **kwargs))
+
+    async def run_cpu(self, func, *args, **kwargs):
+        if self._cpu_executor is None:
+            return func(*args, **kwargs)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._cpu_executor, functools.partial(func, *args, **kwargs))
+
+
+blocking_executor = BlockingExecutor()
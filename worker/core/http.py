@@ -0,0 +1,39 @@
+import aiohttp
+from core.config import Config
+
+
+class HttpClient:
+    """
+    One aiohttp session for the lifetime of the worker, so calls to the API
+    and uploads to storage reuse warm keep-alive connections instead of
+    opening new ones for every image.
+    """
+
+    def __init__(self):
+        self._session = None
+
+    async def start(self) -> None:
+        connector = aiohttp.TCPConnector(
+            limit=Config.WORKER_HTTP_CONNECTION_LIMIT,
+            limit_per_host=Config.WORKER_HTTP_CONNECTION_LIMIT_PER_HOST,
+            ttl_dns_cache=Config.WORKER_HTTP_DNS_CACHE_TTL,
+            keepalive_timeout=Config.WORKER_HTTP_KEEPALIVE_TIMEOUT
+        )
+        self._session = aiohttp.ClientSession(
+            connector=connector,
+            timeout=aiohttp.ClientTimeout(total=Config.WORKER_HTTP_TIMEOUT)
+        )
+
+    async def close(self) -> None:
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    @property
+    def session(self) -> aiohttp.ClientSession:
+        if self._session is None:
+            raise Exception("HTTP client is not started")
+        return self._session
+
+
+http_client = HttpClient()
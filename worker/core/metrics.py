@@ -0,0 +1,61 @@
+import time
+from contextlib import contextmanager
+from datetime import timezone
+from prometheus_client import Gauge, Histogram, start_http_server
+from core.config import Config
+
+# From cache hits and small uploads up to a backed up queue
+STAGE_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+stage_seconds = Histogram(
+    'worker_stage_seconds',
+    'Time a message spends in each stage: queue_wait, download, decode, nsfw, yolo, draw, encode, upload, derivatives_encode, derivatives, callback, total',
+    ['stage'],
+    buckets=STAGE_BUCKETS
+)
+batch_seconds = Histogram(
+    'worker_batch_seconds',
+    'Time one model call takes for a whole batch',
+    ['model'],
+    buckets=STAGE_BUCKETS
+)
+batch_size = Histogram(
+    'worker_batch_size',
+    'Number of images per model call',
+    ['model'],
+    buckets=(1, 2, 4, 8, 16, 32, 64)
+)
+startup_seconds = Gauge('worker_startup_seconds', 'Seconds from process start to the first consume')
+
+
+@contextmanager
+def timed(stage: str):
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        stage_seconds.labels(stage).observe(time.perf_counter() - started)
+
+
+async def observe(stage: str, awaitable):
+    """Await and time one stage; lets concurrent stages (nsfw, yolo) be measured separately."""
+    with timed(stage):
+        return await awaitable
+
+
+def observe_queue_wait(message) -> None:
+    """Time between the API publishing the message and this worker receiving it."""
+    published_at = (message.headers or {}).get('x-published-at')
+    if published_at is None and message.timestamp is not None:
+        timestamp = message.timestamp
+        if timestamp.tzinfo is None:
+            timestamp = timestamp.replace(tzinfo=timezone.utc)
+        published_at = timestamp.timestamp()
+    if published_at is not None:
+        # Clocks of different hosts drift, a negative wait is recorded as none
+        stage_seconds.labels('queue_wait').observe(max(0.0, time.time() - float(published_at)))
+
+
+def start_metrics_server() -> None:
+    if Config.WORKER_METRICS_PORT:
+        start_http_server(Config.WORKER_METRICS_PORT)
@@ -1,4 +1,6 @@
 import boto3
+from boto3.s3.transfer import TransferConfig
+from botocore.config import Config as BotoConfig
 from core.config import Config
 
 class S3Client:
@@ -8,7 +10,13 @@ class S3Client:
             endpoint_url=Config.AWS_S3_ENDPOINT_URL,
             aws_access_key_id=Config.AWS_ACCESS_KEY_ID,
             aws_secret_access_key=Config.AWS_SECRET_ACCESS_KEY,
-            region_name=Config.AWS_REGION
+            region_name=Config.AWS_REGION,
+            config=BotoConfig(max_pool_connections=Config.S3_MAX_POOL_CONNECTIONS)
+        )
+        self.transfer_config = TransferConfig(
+            multipart_threshold=Config.S3_MULTIPART_THRESHOLD,
+            multipart_chunksize=Config.S3_MULTIPART_PART_SIZE,
+            max_concurrency=Config.S3_MULTIPART_CONCURRENCY
         )
         self.bucket_name = Config.AWS_S3_BUCKET_NAME
     
@@ -22,4 +30,22 @@ class S3Client:
         except Exception as e:
             raise Exception(f"Failed to download image from S3: {str(e)}")
 
+    def read_file(self, storage_path) -> bytes:
+        response = self.download_file(storage_path)
+        return response['Body'].read()
+
+    def upload_fileobj(self, file_obj, storage_path, content_type) -> str:
+        try:
+            # Managed transfer: multipart with parallel parts above the threshold
+            self.s3_client.upload_fileobj(
+                file_obj,
+                self.bucket_name,
+                storage_path,
+                ExtraArgs={'ContentType': content_type},
+                Config=self.transfer_config
+            )
+            return storage_path
+        except Exception as e:
+            raise Exception(f"Failed to upload image to S3: {str(e)}")
+
 s3_client = S3Client() 
\ No newline at end of file
@@ -1,34 +1,108 @@
 import asyncio
 import aio_pika
 import logging
+import time
 from core.config import Config
+from core.executor import blocking_executor
+from core.http import http_client
+from core.metrics import start_metrics_server, startup_seconds as startup_gauge
 from processors.image_processor import process_message
+from processors.inference_pool import inference_pool
+from processors.model_registry import warm_models
 
 
-logging.basicConfig(level=logging.INFO)
+logging.basicConfig(level=Config.LOG_LEVEL.upper())
 logger = logging.getLogger(__name__)
 
 
+def tier_queues() -> dict:
+    return {
+        'interactive': Config.RABBITMQ_IMAGE_PROCESSING_QUEUE,
+        'bulk': Config.RABBITMQ_BULK_QUEUE,
+    }
+
+
+def parse_queue_tiers(value: str) -> dict:
+    """
+    'interactive,bulk:4' -> {'interactive': 12, 'bulk': 4} with 16 in flight.
+    Tiers without a count share what the others leave of WORKER_MAX_IN_FLIGHT,
+    capped at WORKER_PREFETCH_COUNT, so the windows never exceed the slots.
+    """
+    counts = {}
+    for entry in value.split(','):
+        tier, _, prefetch = entry.strip().partition(':')
+        if not tier:
+            continue
+        if tier not in tier_queues():
+            raise ValueError(f"Invalid queue tier '{tier}' in WORKER_QUEUE_TIERS. Allowed: {', '.join(tier_queues())}")
+        counts[tier] = int(prefetch) if prefetch else None
+    if not counts:
+        raise ValueError("WORKER_QUEUE_TIERS must name at least one tier")
+
+    unset = [tier for tier, prefetch in counts.items() if prefetch is None]
+    remaining = Config.WORKER_MAX_IN_FLIGHT - sum(prefetch for prefetch in counts.values() if prefetch is not None)
+    if remaining < len(unset):
+        raise ValueError(
+            f"WORKER_QUEUE_TIERS '{value}' asks for more than WORKER_MAX_IN_FLIGHT ({Config.WORKER_MAX_IN_FLIGHT}) "
+            f"messages at once, leaving at least 1 for each tier without a count"
+        )
+    for tier in unset:
+        counts[tier] = min(Config.WORKER_PREFETCH_COUNT, remaining // len(unset))
+    return counts
+
+
+async def warm_up() -> None:
+    """Load and warm the models wherever inference runs."""
+    if inference_pool.enabled:
+        await inference_pool.wait_ready()
+    elif blocking_executor.mode == 'process':
+        # Each process warms its own copy in the pool initializer
+        await blocking_executor.wait_processes_ready()
+    else:
+        await asyncio.to_thread(warm_models)
+
 
 async def main() -> None:
+    started = time.perf_counter()
+    start_metrics_server()
+    blocking_executor.start(process_initializer=warm_models)
+    await http_client.start()
+    if inference_pool.enabled:
+        inference_pool.start()
+    # Models load in the background while the broker connection is set up
+    models_ready = asyncio.create_task(warm_up())
     connection = await aio_pika.connect_robust(
         f"amqp://{Config.RABBITMQ_USER}:{Config.RABBITMQ_PASSWORD}@{Config.RABBITMQ_HOST}:{Config.RABBITMQ_PORT}/{Config.RABBITMQ_VHOST}",
     )
 
     async with connection:
-        channel = await connection.channel()
-        queue = await channel.declare_queue(
-            Config.RABBITMQ_IMAGE_PROCESSING_QUEUE,
-            durable=True
-        )
+        queues = []
+        for tier, prefetch in parse_queue_tiers(Config.WORKER_QUEUE_TIERS).items():
+            # A channel per tier: only this many unacked messages of the tier are delivered at
+            # once, so a bulk backlog never takes up the window of interactive uploads
+            channel = await connection.channel()
+            await channel.set_qos(prefetch_count=prefetch)
+            queue = await channel.declare_queue(tier_queues()[tier], durable=True)
+            queues.append(queue)
+            logger.info(f"Consuming {tier} tier from '{queue.name}' with prefetch {prefetch}")
 
-        await queue.consume(process_message)
+        # Nothing is consumed until the models are warm
+        await models_ready
+        for queue in queues:
+            await queue.consume(process_message)
 
+        startup_seconds = time.perf_counter() - started
+        startup_gauge.set(startup_seconds)
+        logger.info(f"worker_startup_seconds={startup_seconds:.3f}")
         logger.info("Worker started. Waiting for messages...")
         try:
             await asyncio.Future()
         finally:
             await connection.close()
+            if inference_pool.enabled:
+                await inference_pool.close()
+            await http_client.close()
+            blocking_executor.shutdown()
 
 if __name__ == "__main__":
     asyncio.run(main()) 
\ No newline at end of file
@@ -0,0 +1,67 @@
+import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class MicroBatcher:
+    """
+    Collects items submitted by concurrent message handlers and passes them to
+    `handler` as one list once `max_size` items are pending or `max_wait_ms`
+    has elapsed since the first one arrived. `handler` must return one result
+    per item, in order; each caller gets back the result for its own item.
+    A result that is an exception is raised to that item's caller only.
+    """
+
+    def __init__(self, handler, max_size: int, max_wait_ms: int):
+        self.handler = handler
+        self.max_size = max(1, max_size)
+        self.max_wait = max(0, max_wait_ms) / 1000
+        self._pending = []
+        self._timer = None
+        self._tasks = set()
+
+    async def submit(self, item):
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((item, future))
+
+        if len(self._pending) >= self.max_size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_wait, self._flush)
+
+        return await future
+
+    def _flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+        while self._pending:
+            batch = self._pending[:self.max_size]
+            self._pending = self._pending[self.max_size:]
+            task = asyncio.create_task(self._run(batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, batch) -> None:
+        items = [item for item, _ in batch]
+        try:
+            results = await self.handler(items)
+            if len(results) != len(items):
+                raise Exception(f"Batch handler returned {len(results)} results for {len(items)} items")
+        except Exception as e:
+            logger.error(f"Error running batch of {len(items)} items: {e}")
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for (_, future), result in zip(batch, results):
+            if future.done():
+                continue
+            if isinstance(result, Exception):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
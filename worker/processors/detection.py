@@ -0,0 +1,32 @@
+import logging
+import numpy as np
+from processors.model_registry import model_registry
+
+logger = logging.getLogger(__name__)
+
+
+def load_models():
+    return model_registry.load()
+
+
+def run_yolo_detection(image):
+    return run_yolo_detection_batch([image])[0]
+
+def run_yolo_detection_batch(images):
+    _, detector = load_models()
+    return detector.detect_batch(images)
+
+def run_nsfw_detection(image):
+    return run_nsfw_detection_batch([image])[0]
+
+def run_nsfw_detection_batch(images):
+    # Failures propagate so every message of the batch is rejected; an empty
+    # result would report the images as not NSFW and ack them
+    try:
+        detector, _ = load_models()
+        # Prepared buffers are passed through as is, without a copy
+        images_np = [image if isinstance(image, np.ndarray) else np.array(image) for image in images]
+        return detector.detect_batch(images_np, batch_size=len(images_np))
+    except Exception as e:
+        logger.error(f"Error running batched NSFW detection: {e}")
+        raise
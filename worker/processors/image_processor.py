@@ -1,14 +1,24 @@
 import json
+import time
+import hashlib
+import asyncio
 import logging
+import tempfile
+import functools
 import aio_pika
-import numpy as np
-import aiohttp
 from PIL import Image, ImageDraw, ImageFont
 from io import BytesIO
-from nudenet import NudeDetector
 from core.config import Config
 from core.s3utils import s3_client
-from ultralytics import YOLO
+from core.executor import blocking_executor
+from core.http import http_client
+from core.metrics import timed, observe, observe_queue_wait, stage_seconds, batch_seconds, batch_size
+from processors.batcher import MicroBatcher
+from processors.pipeline import BoundedPipeline
+from processors.detection import run_nsfw_detection_batch, run_yolo_detection_batch
+from processors.inference_pool import inference_pool
+from processors.result_cache import ResultCache
+from processors.preprocess import prepare_image, rescale_detections, parse_derivative_sizes
 
 logger = logging.getLogger(__name__)
 
@@ -20,68 +30,90 @@ IMAGE_FORMATS = {
     'webp': {'content_type': 'image/webp', 'pil_format': 'WEBP'}
 }
 
-# Initialize NSFW detector
-nude_detector = NudeDetector()
-model = YOLO('yolov8n.pt')
+# Analyses a message can ask for; annotate draws the boxes of the others onto a processed copy
+ANALYSES = ('nsfw', 'objects', 'annotate')
 
 def get_format_info(image_format: str) -> dict:
     format_key = image_format.lower()
     return IMAGE_FORMATS.get(format_key, IMAGE_FORMATS['jpg'])  # Default to JPEG if unknown
 
+def get_output_format(original_format: str) -> str:
+    if Config.WORKER_OUTPUT_FORMAT == 'original':
+        return original_format
+    if Config.WORKER_OUTPUT_FORMAT not in IMAGE_FORMATS:
+        raise ValueError(f"Invalid WORKER_OUTPUT_FORMAT '{Config.WORKER_OUTPUT_FORMAT}'. Allowed: original, {', '.join(IMAGE_FORMATS)}")
+    return Config.WORKER_OUTPUT_FORMAT
 
-def run_yolo_detection(image):
-    results = model(image)
 
-    detections = []
-    result = results[0]
-    boxes = result.boxes
-    
-    for box in boxes:
-        cls = int(box.cls[0])
-        conf = float(box.conf[0])
-        xyxy = box.xyxy[0].tolist()  
+async def detect_nsfw_batch(images):
+    batch_size.labels('nsfw').observe(len(images))
+    with batch_seconds.labels('nsfw').time():
+        if inference_pool.enabled:
+            return await inference_pool.run('nsfw', images)
+        return await blocking_executor.run_cpu(run_nsfw_detection_batch, images)
+
+async def detect_objects_batch(images):
+    batch_size.labels('yolo').observe(len(images))
+    with batch_seconds.labels('yolo').time():
+        if inference_pool.enabled:
+            return await inference_pool.run('objects', images)
+        return await blocking_executor.run_cpu(run_yolo_detection_batch, images)
 
-        detections.append({
-            'class': result.names[cls],
-            'confidence': conf,
-            'box': xyxy
-        })
-    return detections
+# Images from concurrently delivered messages are grouped so each model runs once per batch
+nsfw_batcher = MicroBatcher(detect_nsfw_batch, Config.WORKER_BATCH_SIZE, Config.WORKER_BATCH_TIMEOUT_MS)
+objects_batcher = MicroBatcher(detect_objects_batch, Config.WORKER_BATCH_SIZE, Config.WORKER_BATCH_TIMEOUT_MS)
 
-def run_nsfw_detection(image):
+async def post_detection_results_bulk(payloads):
     try:
-        image_np = np.array(image)
-        detections = nude_detector.detect(image_np)
-        return detections
+        async with http_client.session.post(
+            f"{Config.API_BASE_URL}/images/detection_results",
+            json={'results': payloads}
+        ) as response:
+            if response.status != 200:
+                error_text = await response.text()
+                raise Exception(f"API request failed: {error_text}")
+            data = await response.json()
     except Exception as e:
-        logger.error(f"Error running NSFW detection: {e}")
-        return []
+        logger.error(f"Error updating detection results via API: {e}")
+        raise
+    
+    missing = set(data.get('missing', []))
+    logger.info(f"Updated detection results for {len(payloads) - len(missing)} images")
+    return [
+        Exception(f"Image {payload['image_id']} not found") if payload['image_id'] in missing else payload['image_id']
+        for payload in payloads
+    ]
 
-async def update_detection_results(image_id, detected_objects, nsfw_detections, processed_image_path):
-    async with aiohttp.ClientSession() as session:
-        try:
-            payload = {
-                'image_id': image_id,
-                'detected_objects': detected_objects,
-                'is_nsfw': len(nsfw_detections) > 0,
-                'detected_nsfw': nsfw_detections,
-                'processed_image_path': processed_image_path
-            }
-            
-            async with session.post(
-                f"{Config.API_BASE_URL}/images/{image_id}/detection_result",
-                json=payload
-            ) as response:
-                if response.status != 200:
-                    error_text = await response.text()
-                    raise Exception(f"API request failed: {error_text}")
-                
-                logger.info(f"Successfully updated detection results for image {image_id}")
-        except Exception as e:
-            logger.error(f"Error updating detection results via API: {e}")
-            raise
+# Results are buffered and written with one request per flush; a message is only
+# acked once the flush containing its result has succeeded
+results_batcher = MicroBatcher(post_detection_results_bulk, Config.WORKER_RESULT_BATCH_SIZE, Config.WORKER_RESULT_FLUSH_MS)
+
+async def update_detection_results(image_id, detected_objects, nsfw_detections, processed_image_path, content_hash=None, analyses=None, image_size=None, derivatives=None):
+    width, height = image_size or (None, None)
+    payload = {
+        'image_id': image_id,
+        'detected_objects': detected_objects,
+        'is_nsfw': len(nsfw_detections) > 0 if nsfw_detections is not None else None,
+        'detected_nsfw': nsfw_detections,
+        'processed_image_path': processed_image_path,
+        'content_hash': content_hash,
+        'analyses': analyses,
+        # Lets clients overlay the boxes on the original image instead of loading a processed copy
+        'width': width,
+        'height': height,
+        'derivatives': derivatives
+    }
+    await results_batcher.submit(payload)
 
-def draw_detections(image, detections, nsfw_detections=None):
+@functools.lru_cache(maxsize=None)
+def load_font(size: int):
+    try:
+        return ImageFont.truetype("arial.ttf", size)
+    except OSError:
+        return ImageFont.load_default()  # Fallback to default font if arial.ttf is not available
+
+def draw_detections(image, detections, nsfw_detections=None, scale=1.0):
+    """Draw boxes given in original image coordinates; `scale` maps them onto a reduced preview."""
     draw = ImageDraw.Draw(image)
     
     # Calculate relative sizes based on image dimensions
@@ -92,15 +124,12 @@ def draw_detections(image, detections, nsfw_detections=None):
     padding = min(10, max(1, int(img_width * 0.005)))   # 0.5% of image width, min 1px, max 10px
     text_padding = min(6, max(1, int(img_width * 0.003)))  # 0.3% of image width, min 1px, max 6px
     
-    # Create font with relative size
-    try:
-        font = ImageFont.truetype("arial.ttf", font_size)
-    except:
-        font = ImageFont.load_default()  # Fallback to default font if arial.ttf is not available
+    # Fonts are loaded once per size
+    font = load_font(font_size)
     
     # Draw regular detections with labels
     for detection in detections:
-        box = detection['box']
+        box = [coord * scale for coord in detection['box']]
         label = detection['class']
         conf = detection['confidence']
         
@@ -140,7 +169,7 @@ def draw_detections(image, detections, nsfw_detections=None):
     # Draw NSFW detections with red boxes (no labels)
     if nsfw_detections:
         for detection in nsfw_detections:
-            box = detection['box']
+            box = [coord * scale for coord in detection['box']]
             # Convert [x, y, width, height] to [x1, y1, x2, y2]
             x1 = max(0, min(box[0] - padding, img_width))
             y1 = max(0, min(box[1] - padding, img_height))
@@ -152,71 +181,254 @@ def draw_detections(image, detections, nsfw_detections=None):
     
     return image
 
+def decode_image(image_data: bytes, max_size: int = 0):
+    """
+    Decode the image annotations are drawn on. With a `max_size` its longest
+    side is bounded (JPEGs are decoded at reduced scale first); the returned
+    scale maps original coordinates onto it.
+    """
+    image = Image.open(BytesIO(image_data))
+    original_width = image.width
+    if max_size and max(image.size) > max_size:
+        image.thumbnail((max_size, max_size), Image.BILINEAR)
+    image.load()
+    return image, image.width / original_width
+
+def encode_image(image, format_info, file_obj) -> int:
+    """Encode into `file_obj` with the configured settings and rewind it. Returns the encoded size."""
+    pil_format = format_info.get('pil_format')
+    options = {}
+    if pil_format == 'JPEG':
+        options['quality'] = Config.WORKER_OUTPUT_QUALITY
+        if image.mode not in ('RGB', 'L'):
+            image = image.convert('RGB')
+    elif pil_format == 'WEBP':
+        options['quality'] = Config.WORKER_OUTPUT_QUALITY
+        if image.mode not in ('RGB', 'RGBA'):
+            image = image.convert('RGBA')
+    elif pil_format == 'PNG':
+        options['compress_level'] = Config.WORKER_PNG_COMPRESS_LEVEL
+    image.save(file_obj, format=pil_format, **options)
+    size = file_obj.tell()
+    file_obj.seek(0)
+    return size
+
+def spool_file():
+    # Encoded output stays in memory up to this size and goes to a temporary file beyond it
+    return tempfile.SpooledTemporaryFile(max_size=Config.WORKER_OUTPUT_SPOOL_SIZE)
+
+async def encode_to_spool(image, format_info, spool) -> int:
+    with timed('encode'):
+        # A spooled file cannot be handed to a process pool, so encoding stays in this process then
+        if blocking_executor.mode == 'process':
+            return await blocking_executor.run_io(encode_image, image, format_info, spool)
+        return await blocking_executor.run_cpu(encode_image, image, format_info, spool)
+
 async def upload_image_to_presigned_url(image, presigned_url, format_info):
     try:
-        img_byte_arr = BytesIO()
-        image.save(img_byte_arr, format=format_info.get('pil_format'))
-        img_byte_arr = img_byte_arr.getvalue()
-        
-        headers = {
-            'Content-Type': format_info.get('content_type')
-        }
-        async with aiohttp.ClientSession() as session:
-            async with session.put(presigned_url, headers=headers, data=img_byte_arr) as response:
-                if response.status != 200:
-                    raise Exception(f"Failed to upload image: {response.status}")
-                return presigned_url.split('?')[0]  # Return the S3 path without query parameters
+        with spool_file() as spool:
+            size = await encode_to_spool(image, format_info, spool)
+            
+            # An explicit length streams the body without chunked encoding, which presigned PUTs reject
+            headers = {
+                'Content-Type': format_info.get('content_type'),
+                'Content-Length': str(size)
+            }
+            with timed('upload'):
+                async with http_client.session.put(presigned_url, headers=headers, data=spool) as response:
+                    if response.status != 200:
+                        raise Exception(f"Failed to upload image: {response.status}")
+                    return presigned_url.split('?')[0]  # Return the S3 path without query parameters
     except Exception as e:
         logger.error(f"Error uploading image to presigned URL: {e}")
         raise
 
-async def get_processed_presigned_url(image_id: int, original_format: str = 'jpg') -> tuple[str, str]:
-    async with aiohttp.ClientSession() as session:
-        format_info = get_format_info(original_format)
+async def upload_image_to_storage(image, storage_path, format_info):
+    try:
+        with spool_file() as spool:
+            await encode_to_spool(image, format_info, spool)
+            with timed('upload'):
+                return await blocking_executor.run_io(
+                    s3_client.upload_fileobj, spool, storage_path, format_info.get('content_type')
+                )
+    except Exception as e:
+        logger.error(f"Error uploading image to storage: {e}")
+        raise
+
+def get_processed_image_path(image_id: int, original_format: str) -> str:
+    return f"processed/{image_id}/detected.{original_format}"
+
+def get_derivative_path(image_id: int, name: str) -> str:
+    return f"processed/{image_id}/{name}.webp"
+
+async def get_processed_presigned_url(image_id: int, storage_path: str, format_info: dict) -> tuple[str, str]:
+    payload = {
+        "storage_path": storage_path,
+        "content_type": format_info.get('content_type'),
+        "expires_in": 3600
+    }
+    async with http_client.session.post(f"{Config.API_BASE_URL}/images/{image_id}/processed_presigned_url", json=payload) as response:
+        if response.status != 200:
+            raise Exception(f"Failed to get presigned URL: {response.status}")
+        presigned_data = await response.json()
+        return presigned_data.get('presigned_url'), presigned_data.get('storage_path')
+
+async def upload_derivatives(image_id: int, derivatives: dict) -> dict:
+    """Store the encoded derivatives next to the processed image. Returns their paths by name."""
+    format_info = IMAGE_FORMATS['webp']
+    
+    async def upload(name: str, data: bytes) -> str:
+        storage_path = get_derivative_path(image_id, name)
+        if Config.WORKER_PROCESSED_UPLOAD_MODE == 'api':
+            presigned_url, storage_path = await get_processed_presigned_url(image_id, storage_path, format_info)
+            async with http_client.session.put(presigned_url, headers={'Content-Type': format_info['content_type']}, data=data) as response:
+                if response.status != 200:
+                    raise Exception(f"Failed to upload derivative: {response.status}")
+        else:
+            await blocking_executor.run_io(s3_client.upload_fileobj, BytesIO(data), storage_path, format_info['content_type'])
+        return storage_path
+    
+    with timed('derivatives'):
+        paths = await asyncio.gather(*[upload(name, data) for name, data in derivatives.items()])
+    return dict(zip(derivatives, paths))
+
+# Compact WebP copies for list views, made from the decode the models already need
+derivative_sizes = parse_derivative_sizes(Config.WORKER_DERIVATIVES)
+
+# Upper bound on messages being worked on at once by this process
+in_flight = asyncio.Semaphore(Config.WORKER_MAX_IN_FLIGHT)
+
+result_cache = ResultCache(Config.WORKER_RESULT_CACHE_SIZE)
+
+pipeline = BoundedPipeline({
+    'download': Config.WORKER_DOWNLOAD_CONCURRENCY,
+    'inference': Config.WORKER_INFERENCE_CONCURRENCY,
+    'upload': Config.WORKER_UPLOAD_CONCURRENCY,
+    'callback': Config.WORKER_CALLBACK_CONCURRENCY,
+})
+
+def compute_content_hash(image_data: bytes) -> str:
+    return hashlib.sha256(image_data).hexdigest()
+
+def requested_analyses(body) -> set:
+    # Messages without an analysis set (published before it existed) get all of them
+    requested = set(body.get('analyses') or ANALYSES) & set(ANALYSES)
+    return requested or set(ANALYSES)
+
+def result_key(content_hash: str, body) -> str:
+    # The same content analysed differently gives different results
+    analyses = ','.join(sorted(requested_analyses(body)))
+    return f"{content_hash}:{analyses}:{bool(body.get('stop_on_nsfw'))}"
+
+async def analyse_image(body, image_data, stage):
+    analyses = requested_analyses(body)
+    
+    # Reduced decode straight to the models' input resolution, which also produces the derivatives
+    started = time.perf_counter()
+    prepared = await blocking_executor.run_cpu(
+        prepare_image, image_data, Config.WORKER_MODEL_INPUT_SIZE, derivative_sizes, Config.WORKER_DERIVATIVE_QUALITY
+    )
+    # The derivatives are encoded in the same call (possibly in another process), which reports their share
+    stage_seconds.labels('derivatives_encode').observe(prepared.derivatives_seconds)
+    stage_seconds.labels('decode').observe(time.perf_counter() - started - prepared.derivatives_seconds)
+    
+    # Get original format from the image; the annotated copy uses it unless WORKER_OUTPUT_FORMAT says otherwise
+    original_format = prepared.format.lower() if prepared.format else 'jpg'
+    output_format = get_output_format(original_format)
+    image_size = prepared.original_size
+    encoded_derivatives = prepared.derivatives
+    
+    await stage.enter('inference')
+    nsfw_detections = None
+    detected_objects = None
+    if 'nsfw' in analyses and body.get('stop_on_nsfw'):
+        # The NSFW verdict decides whether anything else runs, so it goes first
+        nsfw_detections = await observe('nsfw', nsfw_batcher.submit(prepared.tensor))
+        if nsfw_detections:
+            logger.info(f"Image {body['image_id']} flagged NSFW, skipping object detection and annotation")
+            analyses -= {'objects', 'annotate'}
+    
+    # Run the remaining detectors as part of the current batches, both on the same buffer
+    pending = {}
+    if 'nsfw' in analyses and nsfw_detections is None:
+        pending['nsfw'] = observe('nsfw', nsfw_batcher.submit(prepared.tensor))
+    if 'objects' in analyses:
+        pending['objects'] = observe('yolo', objects_batcher.submit(prepared.tensor))
+    results = dict(zip(pending, await asyncio.gather(*pending.values())))
+    nsfw_detections = results.get('nsfw', nsfw_detections)
+    detected_objects = results.get('objects')
+    
+    detected_objects, nsfw_detections = rescale_detections(detected_objects, nsfw_detections, prepared)
+    del prepared
+    logger.debug(f"NSFW detections: {nsfw_detections}")
+    logger.debug(f"YOLO detections: {detected_objects}")
+    
+    await stage.enter('upload')
+    derivatives = await upload_derivatives(body['image_id'], encoded_derivatives)
+    
+    # In vector mode clients draw the boxes themselves, so no annotated copy is produced
+    if 'annotate' not in analyses or Config.WORKER_OUTPUT_MODE == 'vector':
+        return detected_objects, nsfw_detections, None, sorted(analyses), image_size, derivatives
+    
+    # Generate image with detections; the second decode, bounded by WORKER_ANNOTATION_MAX_SIZE, only happens here
+    with timed('draw'):
+        image, scale = await blocking_executor.run_cpu(decode_image, image_data, Config.WORKER_ANNOTATION_MAX_SIZE)
+        image_with_detections = await blocking_executor.run_cpu(
+            draw_detections, image, detected_objects or [], nsfw_detections, scale
+        )
+    
+    if Config.WORKER_PROCESSED_UPLOAD_MODE == 'api':
+        # Get presigned URL and processed path
+        format_info = get_format_info(output_format)
+        presigned_url, processed_image_path = await get_processed_presigned_url(
+            body['image_id'], get_processed_image_path(body['image_id'], output_format), format_info
+        )
         
-        payload = {
-            "storage_path": f"processed/{image_id}/detected.{original_format}",
-            "content_type": format_info.get('content_type'),
-            "expires_in": 3600
-        }
-        async with session.post(f"{Config.API_BASE_URL}/images/{image_id}/processed_presigned_url", json=payload) as response:
-            if response.status != 200:
-                raise Exception(f"Failed to get presigned URL: {response.status}")
-            presigned_data = await response.json()
-            return presigned_data.get('presigned_url'), presigned_data.get('storage_path'), format_info
+        # Upload image to presigned URL
+        await upload_image_to_presigned_url(image_with_detections, presigned_url, format_info)
+    else:
+        # The key is deterministic, so write it with the worker's own credentials and skip the API round trip
+        processed_image_path = get_processed_image_path(body['image_id'], output_format)
+        await upload_image_to_storage(image_with_detections, processed_image_path, get_format_info(output_format))
+    
+    return detected_objects, nsfw_detections, processed_image_path, sorted(analyses), image_size, derivatives
 
 async def process_message(message: aio_pika.abc.AbstractIncomingMessage) -> None:
-    async with message.process():
+    observe_queue_wait(message)
+    async with in_flight, message.process(), pipeline.track() as stage, timed('total'):
         try:
             body = json.loads(message.body.decode())
-            logger.info(f"Received message: {body}")
-            
-            response = s3_client.download_file(body['storage_path'])
-            image_data = response['Body'].read()
-            image = Image.open(BytesIO(image_data))
-            
-            # Get original format from the image
-            original_format = image.format.lower() if image.format else 'jpg'
-            
-            # Run NSFW detection
-            nsfw_detections = run_nsfw_detection(image)
-            logger.info(f"NSFW detections: {nsfw_detections}")
-            
-            # Run YOLO detection
-            detected_objects = run_yolo_detection(image)
-            logger.info(f"YOLO detections: {detected_objects}")
-            
-            # Generate image with detections
-            image_with_detections = draw_detections(image, detected_objects, nsfw_detections)
+            logger.debug(f"Received message: {body}")
             
-            # Get presigned URL and processed path
-            presigned_url, processed_image_path, format_info = await get_processed_presigned_url(body['image_id'], original_format)
+            await stage.enter('download')
+            content_hash = body.get('content_hash')
+            cached = await result_cache.claim(result_key(content_hash, body)) if content_hash else None
+            if cached is None:
+                with timed('download'):
+                    image_data = await blocking_executor.run_io(s3_client.read_file, body['storage_path'])
+                if not content_hash:
+                    content_hash = await blocking_executor.run_io(compute_content_hash, image_data)
+                    cached = await result_cache.claim(result_key(content_hash, body))
             
-            # Upload image to presigned URL
-            await upload_image_to_presigned_url(image_with_detections, presigned_url, format_info)
+            if cached is not None:
+                # Same content was just analysed by this worker, reuse its results and processed image
+                logger.info(f"Reusing cached results for image {body['image_id']} ({content_hash})")
+                detected_objects, nsfw_detections, processed_image_path, analyses, image_size, derivatives = cached
+            else:
+                try:
+                    result = await analyse_image(body, image_data, stage)
+                except Exception as e:
+                    result_cache.discard(result_key(content_hash, body), e)
+                    raise
+                result_cache.store(result_key(content_hash, body), result)
+                detected_objects, nsfw_detections, processed_image_path, analyses, image_size, derivatives = result
             
             # Update detection results
-            await update_detection_results(body['image_id'], detected_objects, nsfw_detections, processed_image_path)
+            await stage.enter('callback')
+            with timed('callback'):
+                await update_detection_results(
+                    body['image_id'], detected_objects, nsfw_detections, processed_image_path, content_hash, analyses, image_size, derivatives
+                )
             
         except Exception as e:
             logger.error(f"Error processing message: {e}")
@@ -0,0 +1,179 @@
+import asyncio
+import itertools
+import logging
+import multiprocessing
+import threading
+import numpy as np
+from multiprocessing import shared_memory
+from core.config import Config
+
+logger = logging.getLogger(__name__)
+
+
+def inference_worker_main(task_queue, result_queue, ready) -> None:
+    """
+    Entry point of an inference process. Loads and warms its own copy of the
+    models, signals `ready`, then runs detection on image buffers placed in
+    shared memory by the supervisor.
+    """
+    from processors.detection import run_nsfw_detection_batch, run_yolo_detection_batch
+    from processors.model_registry import model_registry
+
+    model_registry.warm()
+    ready.set()
+    while True:
+        task = task_queue.get()
+        if task is None:
+            break
+
+        task_id, kind, shm_name, layout = task
+        shm = None
+        arrays = None
+        try:
+            # The supervisor unlinks the block of a cancelled batch, which may
+            # happen before it is opened here; that fails this batch only
+            shm = shared_memory.SharedMemory(name=shm_name)
+            arrays = [
+                np.ndarray(shape, dtype=np.uint8, buffer=shm.buf, offset=offset)
+                for shape, offset in layout
+            ]
+            if kind == 'nsfw':
+                result = run_nsfw_detection_batch(arrays)
+            else:
+                # The ultralytics predictor keeps references to its last inputs,
+                # which would keep the block from being closed
+                result = run_yolo_detection_batch([array.copy() for array in arrays])
+            result_queue.put((task_id, result, None))
+        except Exception as e:
+            result_queue.put((task_id, None, str(e)))
+        finally:
+            # Views into the block must be gone before it can be closed
+            arrays = None
+            if shm is not None:
+                shm.close()
+
+
+class InferencePool:
+    """
+    Supervises WORKER_INFERENCE_PROCESSES inference processes, each with its
+    own model copy. Prepared image buffers are handed over through a shared memory
+    block per batch instead of being pickled, and only the small detection
+    results travel back through a queue. Children that die are restarted and
+    the batches they were running fail so their messages are rejected.
+    """
+
+    def __init__(self, processes: int):
+        self.processes = processes
+        self._context = multiprocessing.get_context('spawn')
+        self._result_queue = None
+        self._children = []
+        self._futures = {}
+        self._task_ids = itertools.count()
+        self._loop = None
+        self._reader = None
+        self._monitor = None
+
+    @property
+    def enabled(self) -> bool:
+        return self.processes > 0
+
+    def start(self) -> None:
+        self._loop = asyncio.get_running_loop()
+        self._result_queue = self._context.Queue()
+        self._children = [self._spawn_child(index) for index in range(self.processes)]
+        self._reader = threading.Thread(target=self._read_results, name='inference-results', daemon=True)
+        self._reader.start()
+        self._monitor = asyncio.create_task(self._supervise())
+        logger.info(f"Inference pool started with {self.processes} processes")
+
+    async def close(self) -> None:
+        if self._monitor is not None:
+            self._monitor.cancel()
+        for child in self._children:
+            child['queue'].put(None)
+        for child in self._children:
+            await asyncio.to_thread(child['process'].join, 10)
+            if child['process'].is_alive():
+                child['process'].terminate()
+        self._result_queue.put(None)
+        self._children = []
+
+    def _spawn_child(self, index: int) -> dict:
+        task_queue = self._context.Queue()
+        ready = self._context.Event()
+        process = self._context.Process(
+            target=inference_worker_main,
+            args=(task_queue, self._result_queue, ready),
+            name=f"inference-{index}",
+            daemon=True
+        )
+        process.start()
+        return {'index': index, 'process': process, 'queue': task_queue, 'ready': ready, 'tasks': set()}
+
+    async def wait_ready(self) -> None:
+        """Wait until every inference process has loaded and warmed its models."""
+        for child in list(self._children):
+            while not await asyncio.to_thread(child['ready'].wait, Config.WORKER_POOL_MONITOR_INTERVAL):
+                if not child['process'].is_alive():
+                    raise Exception(f"Inference process {child['process'].name} exited with code {child['process'].exitcode} while loading models")
+
+    async def _supervise(self) -> None:
+        while True:
+            await asyncio.sleep(Config.WORKER_POOL_MONITOR_INTERVAL)
+            for position, child in enumerate(self._children):
+                if child['process'].is_alive():
+                    continue
+                logger.error(f"Inference process {child['process'].name} exited with code {child['process'].exitcode}, restarting")
+                for task_id in list(child['tasks']):
+                    self._resolve(task_id, None, f"Inference process {child['process'].name} died")
+                self._children[position] = self._spawn_child(child['index'])
+
+    def _read_results(self) -> None:
+        while True:
+            item = self._result_queue.get()
+            if item is None:
+                break
+            self._loop.call_soon_threadsafe(self._resolve, *item)
+
+    def _resolve(self, task_id: int, result, error) -> None:
+        entry = self._futures.pop(task_id, None)
+        if entry is None:
+            return
+        future, child = entry
+        child['tasks'].discard(task_id)
+        if future.done():
+            return
+        if error is not None:
+            future.set_exception(Exception(f"Inference failed: {error}"))
+        else:
+            future.set_result(result)
+
+    @staticmethod
+    def _pack(arrays) -> tuple:
+        shm = shared_memory.SharedMemory(create=True, size=max(1, sum(array.nbytes for array in arrays)))
+        layout = []
+        offset = 0
+        for array in arrays:
+            target = np.ndarray(array.shape, dtype=np.uint8, buffer=shm.buf, offset=offset)
+            target[...] = array
+            layout.append((array.shape, offset))
+            offset += array.nbytes
+        return shm, layout
+
+    async def run(self, kind: str, arrays) -> list:
+        shm, layout = await asyncio.to_thread(self._pack, arrays)
+        try:
+            task_id = next(self._task_ids)
+            future = self._loop.create_future()
+            # Hand the batch to the least busy child
+            child = min(self._children, key=lambda c: len(c['tasks']))
+            child['tasks'].add(task_id)
+            self._futures[task_id] = (future, child)
+            child['queue'].put((task_id, kind, shm.name, layout))
+            return await future
+        finally:
+            shm.close()
+            shm.unlink()
+
+
+inference_pool = InferencePool(Config.WORKER_INFERENCE_PROCESSES)
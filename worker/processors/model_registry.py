@@ -0,0 +1,80 @@
+import logging
+import os
+import threading
+import time
+import numpy as np
+from core.config import Config
+from processors.preprocess import LETTERBOX_FILL
+from processors.yolo_backends import create_yolo_detector
+
+logger = logging.getLogger(__name__)
+
+
+class ModelRegistry:
+    """
+    The detectors of one process. Models are created once, on first use or
+    ahead of time by `warm`, and only from files in WORKER_MODEL_CACHE_DIR:
+    nothing is downloaded at runtime. Processes that never run inference
+    (such as the supervisor of an inference pool) never load them.
+    """
+
+    def __init__(self):
+        self.nude_detector = None
+        self.yolo_detector = None
+        self.load_seconds = None
+        self.warmup_seconds = None
+        self._lock = threading.Lock()
+
+    @property
+    def ready(self) -> bool:
+        return self.warmup_seconds is not None
+
+    @staticmethod
+    def resolve_path(model_path: str) -> str:
+        path = model_path if os.path.isabs(model_path) else os.path.join(Config.WORKER_MODEL_CACHE_DIR, model_path)
+        if not os.path.exists(path):
+            raise Exception(f"Model {path} not found. Models are not downloaded at runtime, place it in WORKER_MODEL_CACHE_DIR")
+        return path
+
+    def load(self) -> tuple:
+        with self._lock:
+            if self.nude_detector is None or self.yolo_detector is None:
+                start = time.perf_counter()
+                if self.nude_detector is None:
+                    # NudeNet ships its ONNX model inside the package
+                    from nudenet import NudeDetector
+                    self.nude_detector = NudeDetector()
+                if self.yolo_detector is None:
+                    self.yolo_detector = create_yolo_detector(model_path=self.resolve_path(Config.WORKER_YOLO_MODEL_PATH))
+                self.load_seconds = time.perf_counter() - start
+        return self.nude_detector, self.yolo_detector
+
+    def warm(self) -> float:
+        """
+        Load the models and run WORKER_WARMUP_BATCH_SIZE blank buffers through
+        both, so the first real batch does not pay for lazy initialisation.
+        Returns the seconds spent loading and warming up.
+        """
+        nude_detector, yolo_detector = self.load()
+        with self._lock:
+            if self.warmup_seconds is None:
+                start = time.perf_counter()
+                if Config.WORKER_WARMUP_BATCH_SIZE > 0:
+                    size = Config.WORKER_MODEL_INPUT_SIZE
+                    batch = [
+                        np.full((size, size, 3), LETTERBOX_FILL, dtype=np.uint8)
+                        for _ in range(Config.WORKER_WARMUP_BATCH_SIZE)
+                    ]
+                    nude_detector.detect_batch(batch, batch_size=len(batch))
+                    yolo_detector.detect_batch(batch)
+                self.warmup_seconds = time.perf_counter() - start
+                logger.info(f"Models loaded in {self.load_seconds:.2f}s and warmed up in {self.warmup_seconds:.2f}s")
+        return self.load_seconds + self.warmup_seconds
+
+
+model_registry = ModelRegistry()
+
+
+def warm_models() -> float:
+    # Module level so it can be sent to a process pool
+    return model_registry.warm()
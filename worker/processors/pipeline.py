@@ -0,0 +1,41 @@
+import asyncio
+from contextlib import asynccontextmanager
+
+
+class BoundedPipeline:
+    """
+    Bounds how many messages can be inside each processing stage at once.
+
+    A message acquires a slot in the next stage before it gives up the slot it
+    holds, so when a stage is saturated the stages before it stall instead of
+    piling work up in memory between them. Messages stalled this way are not
+    acked, which fills the channel prefetch window and makes RabbitMQ stop
+    delivering until capacity frees up.
+    """
+
+    def __init__(self, limits: dict):
+        self._slots = {name: asyncio.Semaphore(max(1, limit)) for name, limit in limits.items()}
+
+    @asynccontextmanager
+    async def track(self):
+        tracker = StageTracker(self._slots)
+        try:
+            yield tracker
+        finally:
+            tracker.release()
+
+
+class StageTracker:
+    def __init__(self, slots: dict):
+        self._slots = slots
+        self.current = None
+
+    async def enter(self, stage: str) -> None:
+        await self._slots[stage].acquire()
+        self.release()
+        self.current = stage
+
+    def release(self) -> None:
+        if self.current is not None:
+            self._slots[self.current].release()
+            self.current = None
@@ -0,0 +1,113 @@
+import time
+import numpy as np
+from io import BytesIO
+from PIL import Image
+
+LETTERBOX_FILL = 114
+
+
+class PreparedImage:
+    """
+    Model input for one image: a square, letterboxed, C-contiguous BGR uint8
+    buffer that both detectors read as is, plus what is needed to map boxes
+    back to the original image.
+    """
+
+    def __init__(self, tensor, scale, pad, original_size, image_format, derivatives=None, derivatives_seconds=0.0):
+        self.tensor = tensor
+        self.scale = scale
+        self.pad = pad
+        self.original_size = original_size
+        self.format = image_format
+        # Encoded WebP derivatives by name
+        self.derivatives = derivatives or {}
+        # Time spent resizing and encoding them, reported apart from the decode
+        self.derivatives_seconds = derivatives_seconds
+
+
+def parse_derivative_sizes(spec: str) -> dict:
+    """'thumbnail:256,medium:1024' -> {'thumbnail': 256, 'medium': 1024}"""
+    sizes = {}
+    for item in spec.split(','):
+        if not item.strip():
+            continue
+        name, _, side = item.partition(':')
+        sizes[name.strip()] = int(side)
+    return sizes
+
+
+def encode_webp(image, quality: int) -> bytes:
+    buffer = BytesIO()
+    image.save(buffer, format='WEBP', quality=quality)
+    return buffer.getvalue()
+
+
+def prepare_image(image_data: bytes, size: int, derivative_sizes: dict = None, derivative_quality: int = 75) -> PreparedImage:
+    image = Image.open(BytesIO(image_data))
+    image_format = image.format
+    original_width, original_height = image.size
+
+    # JPEGs can be decoded at 1/2, 1/4 or 1/8 scale straight from the DCT data,
+    # so a 20 MP photo never needs to be decoded at full resolution here.
+    # The same decode serves the derivatives, so it must cover the largest one.
+    decode_size = max([size, *(derivative_sizes or {}).values()])
+    if image_format == 'JPEG':
+        image.draft('RGB', (decode_size, decode_size))
+    image = image.convert('RGB')
+
+    started = time.perf_counter()
+    # Largest first, each one reduced from the previous
+    derivatives = {}
+    source = image
+    for name, side in sorted((derivative_sizes or {}).items(), key=lambda item: item[1], reverse=True):
+        source = source.copy()
+        source.thumbnail((side, side))
+        derivatives[name] = encode_webp(source, derivative_quality)
+    del source
+    derivatives_seconds = time.perf_counter() - started
+
+    scale = min(size / original_width, size / original_height)
+    width = max(1, round(original_width * scale))
+    height = max(1, round(original_height * scale))
+    if image.size != (width, height):
+        image = image.resize((width, height), Image.BILINEAR)
+
+    pad_x = (size - width) // 2
+    pad_y = (size - height) // 2
+    tensor = np.full((size, size, 3), LETTERBOX_FILL, dtype=np.uint8)
+    # Both detectors follow the OpenCV convention of BGR input
+    tensor[pad_y:pad_y + height, pad_x:pad_x + width] = np.asarray(image)[..., ::-1]
+
+    return PreparedImage(tensor, scale, (pad_x, pad_y), (original_width, original_height), image_format, derivatives, derivatives_seconds)
+
+
+def rescale_xyxy(box, prepared: PreparedImage) -> list:
+    pad_x, pad_y = prepared.pad
+    width, height = prepared.original_size
+    x1, y1, x2, y2 = box
+    return [
+        min(max((x1 - pad_x) / prepared.scale, 0), width),
+        min(max((y1 - pad_y) / prepared.scale, 0), height),
+        min(max((x2 - pad_x) / prepared.scale, 0), width),
+        min(max((y2 - pad_y) / prepared.scale, 0), height),
+    ]
+
+
+def rescale_xywh(box, prepared: PreparedImage) -> list:
+    x1, y1, x2, y2 = rescale_xyxy([box[0], box[1], box[0] + box[2], box[1] + box[3]], prepared)
+    return [round(x1), round(y1), round(x2 - x1), round(y2 - y1)]
+
+
+def rescale_detections(detected_objects, nsfw_detections, prepared: PreparedImage) -> tuple:
+    """Map boxes from model input coordinates back to the original image. None (not run) is kept as is."""
+    if detected_objects is not None:
+        detected_objects = [
+            {**detection, 'box': rescale_xyxy(detection['box'], prepared)}
+            for detection in detected_objects
+        ]
+    if nsfw_detections is not None:
+        nsfw_detections = [
+            {**detection, 'box': rescale_xywh(detection['box'], prepared)}
+            for detection in nsfw_detections
+        ]
+    return detected_objects, nsfw_detections
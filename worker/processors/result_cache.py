@@ -0,0 +1,55 @@
+import asyncio
+from collections import OrderedDict
+
+
+class ResultCache:
+    """
+    Detection results keyed by image content hash and requested analyses, so
+    duplicate images that reach this worker close together (in the same batch
+    window or shortly after) are analysed once.
+
+    The first message for a hash claims it and must later `store` or
+    `discard` it. Messages for the same hash that arrive meanwhile wait for
+    that result. Only the `max_size` most recent hashes are kept.
+    """
+
+    def __init__(self, max_size: int):
+        self.max_size = max(1, max_size)
+        self._entries = OrderedDict()
+
+    async def claim(self, key: str):
+        """Return the cached result for `key`, or None if the caller must compute it."""
+        future = self._entries.get(key)
+        if future is None:
+            self._entries[key] = asyncio.get_running_loop().create_future()
+            self._evict()
+            return None
+
+        self._entries.move_to_end(key)
+        try:
+            return await asyncio.shield(future)
+        except Exception:
+            # The owner failed; compute it independently
+            return None
+
+    def store(self, key: str, result) -> None:
+        future = self._entries.get(key)
+        if future is None or future.done():
+            future = asyncio.get_running_loop().create_future()
+            self._entries[key] = future
+        future.set_result(result)
+        self._evict()
+
+    def discard(self, key: str, error: Exception) -> None:
+        future = self._entries.pop(key, None)
+        if future is not None and not future.done():
+            future.set_exception(error)
+            # Mark the exception as retrieved in case nobody was waiting
+            future.exception()
+
+    def _evict(self) -> None:
+        while len(self._entries) > self.max_size:
+            oldest = next(iter(self._entries))
+            if not self._entries[oldest].done():
+                break
+            self._entries.popitem(last=False)
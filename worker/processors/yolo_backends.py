@@ -0,0 +1,157 @@
+import ast
+import threading
+import numpy as np
+from core.config import Config
+
+YOLO_BACKENDS = ('ultralytics', 'onnx', 'openvino')
+
+ONNX_GRAPH_OPTIMIZATION_LEVELS = {
+    'disable': 'ORT_DISABLE_ALL',
+    'basic': 'ORT_ENABLE_BASIC',
+    'extended': 'ORT_ENABLE_EXTENDED',
+    'all': 'ORT_ENABLE_ALL',
+}
+
+# Offset added per class so a single NMS pass never suppresses across classes
+NMS_CLASS_OFFSET = 7680
+
+
+def parse_yolo_result(result):
+    detections = []
+    boxes = result.boxes
+
+    for box in boxes:
+        cls = int(box.cls[0])
+        conf = float(box.conf[0])
+        xyxy = box.xyxy[0].tolist()
+
+        detections.append({
+            'class': result.names[cls],
+            'confidence': conf,
+            'box': xyxy
+        })
+    return detections
+
+
+class UltralyticsDetector:
+    """
+    YOLO through ultralytics: a PyTorch `.pt` checkpoint, or an exported
+    OpenVINO model directory (`yolo export format=openvino`, needs the
+    `openvino` package).
+    """
+
+    def __init__(self, model_path: str):
+        from ultralytics import YOLO
+        self.model = YOLO(model_path, task='detect')
+        # The ultralytics predictor is not safe to call from several threads at once
+        self.lock = threading.Lock()
+
+    def detect_batch(self, images) -> list:
+        # A single forward pass over the whole list; results come back in input order
+        with self.lock:
+            results = self.model(
+                images,
+                conf=Config.WORKER_YOLO_CONFIDENCE,
+                iou=Config.WORKER_YOLO_IOU,
+                max_det=Config.WORKER_YOLO_MAX_DETECTIONS
+            )
+        return [parse_yolo_result(result) for result in results]
+
+
+class OnnxDetector:
+    """
+    YOLOv8 exported to ONNX (`yolo export format=onnx`, add `dynamic=True` to
+    run whole batches in one call), run directly with ONNX Runtime on CPU.
+    Takes the prepared square BGR buffers and returns the same detection dicts
+    as the ultralytics path.
+    """
+
+    def __init__(self, model_path: str):
+        import onnxruntime as ort
+
+        options = ort.SessionOptions()
+        options.intra_op_num_threads = Config.WORKER_ONNX_INTRA_OP_THREADS
+        options.inter_op_num_threads = Config.WORKER_ONNX_INTER_OP_THREADS
+        options.graph_optimization_level = getattr(
+            ort.GraphOptimizationLevel,
+            ONNX_GRAPH_OPTIMIZATION_LEVELS[Config.WORKER_ONNX_GRAPH_OPTIMIZATION]
+        )
+        self.session = ort.InferenceSession(model_path, sess_options=options, providers=['CPUExecutionProvider'])
+
+        metadata = self.session.get_modelmeta().custom_metadata_map
+        self.names = ast.literal_eval(metadata['names'])
+        model_input = self.session.get_inputs()[0]
+        self.input_name = model_input.name
+        self.input_size = model_input.shape[2] if isinstance(model_input.shape[2], int) else Config.WORKER_MODEL_INPUT_SIZE
+        # Exports without dynamic=True have a fixed batch dimension of 1
+        self.dynamic_batch = not isinstance(model_input.shape[0], int)
+
+    def _to_input(self, images) -> np.ndarray:
+        for image in images:
+            if not isinstance(image, np.ndarray) or image.shape != (self.input_size, self.input_size, 3):
+                raise ValueError(f"ONNX backend expects prepared {self.input_size}x{self.input_size} BGR buffers")
+        # BGR HWC uint8 -> RGB NCHW float in [0, 1]
+        batch = np.stack(images)[..., ::-1].transpose(0, 3, 1, 2)
+        return np.ascontiguousarray(batch, dtype=np.float32) / 255.0
+
+    def detect_batch(self, images) -> list:
+        if self.dynamic_batch:
+            outputs = self.session.run(None, {self.input_name: self._to_input(images)})[0]
+        else:
+            outputs = np.concatenate([
+                self.session.run(None, {self.input_name: self._to_input([image])})[0]
+                for image in images
+            ])
+        return [self._postprocess(output) for output in outputs]
+
+    def _postprocess(self, output: np.ndarray) -> list:
+        # (4 + classes, anchors) -> (anchors, 4 + classes)
+        predictions = output.T
+        scores = predictions[:, 4:]
+        classes = scores.argmax(axis=1)
+        confidences = scores[np.arange(len(scores)), classes]
+        mask = confidences > Config.WORKER_YOLO_CONFIDENCE
+        predictions, classes, confidences = predictions[mask], classes[mask], confidences[mask]
+        if not len(predictions):
+            return []
+
+        cx, cy, w, h = predictions[:, 0], predictions[:, 1], predictions[:, 2], predictions[:, 3]
+        boxes = np.stack([cx - w / 2, cy - h / 2, cx + w / 2, cy + h / 2], axis=1)
+        keep = non_max_suppression(boxes + classes[:, None] * NMS_CLASS_OFFSET, confidences, Config.WORKER_YOLO_IOU)
+        keep = keep[:Config.WORKER_YOLO_MAX_DETECTIONS]
+
+        return [
+            {
+                'class': self.names[int(classes[index])],
+                'confidence': float(confidences[index]),
+                'box': boxes[index].tolist()
+            }
+            for index in keep
+        ]
+
+
+def non_max_suppression(boxes: np.ndarray, scores: np.ndarray, iou_threshold: float) -> np.ndarray:
+    x1, y1, x2, y2 = boxes[:, 0], boxes[:, 1], boxes[:, 2], boxes[:, 3]
+    areas = (x2 - x1) * (y2 - y1)
+    order = scores.argsort()[::-1]
+    keep = []
+    while order.size:
+        best = order[0]
+        keep.append(best)
+        rest = order[1:]
+        width = np.clip(np.minimum(x2[best], x2[rest]) - np.maximum(x1[best], x1[rest]), 0, None)
+        height = np.clip(np.minimum(y2[best], y2[rest]) - np.maximum(y1[best], y1[rest]), 0, None)
+        intersection = width * height
+        iou = intersection / (areas[best] + areas[rest] - intersection + 1e-7)
+        order = rest[iou <= iou_threshold]
+    return np.array(keep, dtype=np.int64)
+
+
+def create_yolo_detector(backend: str = None, model_path: str = None):
+    backend = backend or Config.WORKER_YOLO_BACKEND
+    model_path = model_path or Config.WORKER_YOLO_MODEL_PATH
+    if backend not in YOLO_BACKENDS:
+        raise ValueError(f"Invalid WORKER_YOLO_BACKEND '{backend}'. Allowed: {', '.join(YOLO_BACKENDS)}")
+    if backend == 'onnx':
+        return OnnxDetector(model_path)
+    return UltralyticsDetector(model_path)
@@ -0,0 +1,61 @@
+"""
+Detections of exported YOLO models against the PyTorch model, with the same
+thresholds as benchmarks.yolo_backends. Backends whose model is not in
+WORKER_MODEL_CACHE_DIR are skipped; the configured WORKER_YOLO_BACKEND and
+WORKER_YOLO_MODEL_PATH are always checked. Synthetic noise yields few
+detections, so point YOLO_PARITY_IMAGE_DIR at real photos. Run from the worker
+directory:
+    YOLO_PARITY_IMAGE_DIR=./samples python -m pytest tests
+    WORKER_YOLO_BACKEND=onnx WORKER_YOLO_MODEL_PATH=yolov8n.onnx YOLO_PARITY_IMAGE_DIR=./samples python -m pytest tests
+"""
+import os
+import pytest
+
+pytest.importorskip("ultralytics")
+from core.config import Config
+from processors.yolo_backends import create_yolo_detector
+from benchmarks.corpus import load_tensors
+from benchmarks.yolo_backends import parity_share
+
+REFERENCE_MODEL = 'yolov8n.pt'
+# Paths written by the yolo export commands in the README
+EXPORTED_MODELS = {('onnx', 'yolov8n.onnx'), ('openvino', 'yolov8n_openvino_model')}
+if Config.WORKER_YOLO_BACKEND != 'ultralytics':
+    EXPORTED_MODELS.add((Config.WORKER_YOLO_BACKEND, Config.WORKER_YOLO_MODEL_PATH.rstrip('/')))
+
+MIN_IOU = 0.9
+MAX_CONFIDENCE_DIFF = 0.05
+MIN_PARITY = 0.95
+IMAGE_DIR = os.getenv('YOLO_PARITY_IMAGE_DIR')
+
+
+def model_path(name: str) -> str:
+    path = name if os.path.isabs(name) else os.path.join(Config.WORKER_MODEL_CACHE_DIR, name)
+    if not os.path.exists(path):
+        pytest.skip(f"{path} not found")
+    return path
+
+
+@pytest.fixture(scope="module")
+def images():
+    return load_tensors(16, 640, IMAGE_DIR)
+
+
+@pytest.fixture(scope="module")
+def reference(images):
+    detector = create_yolo_detector('ultralytics', model_path(REFERENCE_MODEL))
+    return detector.detect_batch(images)
+
+
+@pytest.mark.parametrize("backend, name", sorted(EXPORTED_MODELS))
+def test_exported_model_matches_pytorch(backend, name, images, reference):
+    path = model_path(name)
+    if backend == 'openvino':
+        pytest.importorskip("openvino")
+    else:
+        pytest.importorskip("onnxruntime")
+    detector = create_yolo_detector(backend, path)
+
+    share = parity_share(reference, detector.detect_batch(images), MIN_IOU, MAX_CONFIDENCE_DIFF)
+
+    assert share >= MIN_PARITY, f"{backend} {path} matches {share:.1%} of the PyTorch detections"